@@ -0,0 +1,93 @@
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+# Queues rows in process and hands them to `write` in batches from a background thread. The queue is flushed
+# every USER_ACTIVITY_BUFFER_INTERVAL seconds, as soon as USER_ACTIVITY_BUFFER_SIZE rows are queued and when
+# the worker exits. Without USER_ACTIVITY_BUFFER every row is written right away.
+class ActivityRecorder:
+    def __init__(self, write):
+        self.write = write
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, row):
+        if not settings.USER_ACTIVITY_BUFFER:
+            self.write([row])
+            return
+
+        rows = None
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+
+            if len(self._queue) >= settings.USER_ACTIVITY_BUFFER_MAX_SIZE:
+                if settings.USER_ACTIVITY_BUFFER_POLICY == 'drop':
+                    self.dropped += 1
+                    logger.warning(
+                        'User activity buffer is full, %d rows dropped so far.', self.dropped)
+                    return
+
+                rows = self._drain()
+
+            self._queue.append(row)
+
+            if self._thread is None:
+                self._start()
+
+            if len(self._queue) >= settings.USER_ACTIVITY_BUFFER_SIZE:
+                self._wakeup.set()
+
+        # Backpressure, the request that found the queue full writes it
+        if rows:
+            self.write(rows)
+
+    def flush(self):
+        with self._lock:
+            rows = self._drain()
+
+        if rows:
+            self.write(rows)
+
+    def _drain(self):
+        rows = list(self._queue)
+        self._queue.clear()
+
+        return rows
+
+    def _start(self):
+        self._thread = threading.Thread(
+            target=self._run, name='user-activity-recorder', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.USER_ACTIVITY_BUFFER_INTERVAL)
+            self._wakeup.clear()
+
+            # Reuse the thread's connection the same way requests do, within CONN_MAX_AGE
+            close_old_connections()
+
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to write user activity.')
+            finally:
+                close_old_connections()
@@ -1,10 +1,16 @@
 from django.conf import settings
 from django.contrib import admin
 
-from .models import User, UserPrimaryEmail, UserProfile, UserActivity
+from .models import User, UserPrimaryEmail, UserProfile, UserActivity, UserActivityDay, UserActivityAddress, \
+    UserAgent, UserFingerprints, EmailOutbox
 
 if settings.DEBUG:
     admin.site.register(User)
     admin.site.register(UserPrimaryEmail)
     admin.site.register(UserProfile)
     admin.site.register(UserActivity)
+    admin.site.register(UserActivityDay)
+    admin.site.register(UserActivityAddress)
+    admin.site.register(UserAgent)
+    admin.site.register(UserFingerprints)
+    admin.site.register(EmailOutbox)
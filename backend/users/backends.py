@@ -1,8 +1,14 @@
 import jwt
 from django.conf import settings
+from django.contrib.auth.backends import AllowAllUsersModelBackend
+from django.utils.crypto import get_random_string
+from django.db import DEFAULT_DB_ALIAS
 from rest_framework import authentication, exceptions
 
+from .cache import token_identifier_cache, token_user_cache
+from .hashing import check_password, make_password
 from .models import User
+from .signing import signing_keys
 
 
 class JWTAuthentication(authentication.BaseAuthentication):
@@ -31,22 +37,119 @@ class JWTAuthentication(authentication.BaseAuthentication):
         return self.authenticate_credentials(request, token)
 
     def authenticate_credentials(self, request, token):
+        payload = self.decode_token(token)
+        user = self.get_user(payload, self.get_queryset(request))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                'This account has been disabled.')
+
+        return user, token
+
+    def decode_token(self, token):
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY)
+            return signing_keys.decode(token)
         except jwt.ExpiredSignatureError:
             raise exceptions.AuthenticationFailed('This token has expired.')
         except jwt.InvalidTokenError:
             raise exceptions.AuthenticationFailed('This token is invalid.')
 
+    # Views list the relations they read from the user in `authentication_select_related`, they are loaded with it
+    def get_queryset(self, request):
+        related = getattr(request.parser_context.get('view'), 'authentication_select_related', ())
+
+        # select_related() without fields would follow every foreign key
+        return User.objects.select_related(*related) if related else User.objects.all()
+
+    def get_user(self, payload, queryset=None):
+        if queryset is None:
+            queryset = User.objects
+
+        if token_user_cache.enabled:
+            values = token_user_cache.get(payload['sub'], payload['jti'])
+
+            if values is not None:
+                return User.from_db(DEFAULT_DB_ALIAS, list(values), list(values.values()))
+
         try:
-            user = User.objects.get(
+            user = queryset.get(
                 username=payload['sub'], token_identifier=payload['jti'])
         except User.DoesNotExist:
             raise exceptions.AuthenticationFailed(
                 'This token is not associated with an account.')
 
-        if not user.is_active:
+        if token_user_cache.enabled:
+            values = {field: getattr(user, field)
+                      for field in self.get_cached_fields()}
+            token_user_cache.add(payload['sub'], payload['jti'], values)
+
+        return user
+
+    # The password hash stays out of the cache, cached users load it from the database when it is needed
+    def get_cached_fields(self):
+        return [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+class TokenUser:
+    is_anonymous = False
+    is_authenticated = True
+
+    def __init__(self, pk, username, is_active):
+        self.pk = self.id = pk
+        self.username = username
+        self.is_active = is_active
+
+    def __str__(self):
+        return self.username
+
+
+# Only checks that a token is still current, the user is loaded from the database on a cache miss
+class JWTVerifyAuthentication(JWTAuthentication):
+    def get_user(self, payload, queryset=None):
+        if not token_identifier_cache.enabled:
+            return super().get_user(payload, queryset)
+
+        value = token_identifier_cache.get(payload['sub'])
+
+        if value is None:
+            user = super().get_user(payload, queryset)
+            token_identifier_cache.add(
+                user.username, token_identifier_cache.make_value(user))
+
+            return user
+
+        token_identifier, user_id, is_active = value
+
+        if token_identifier != payload['jti']:
             raise exceptions.AuthenticationFailed(
-                'This account has been disabled.')
+                'This token is not associated with an account.')
 
-        return user, token
+        return TokenUser(user_id, payload['sub'], is_active)
+
+
+class UserModelBackend(AllowAllUsersModelBackend):
+    dummy_password = None
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+
+        if username is None or password is None:
+            return None
+
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Verify against a hash made once per process, so an unknown username costs exactly one
+            # verification, the same as a wrong password
+            check_password(password, self.get_dummy_password())
+        else:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+
+    @classmethod
+    def get_dummy_password(cls):
+        if cls.dummy_password is None:
+            cls.dummy_password = make_password(get_random_string())
+
+        return cls.dummy_password
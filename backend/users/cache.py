@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Per-process LRU cache, entries expire after `timeout` seconds
+class LocalCache:
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+
+        expires_at = None if self.timeout is None else time.monotonic() + self.timeout
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Users resolved from a token's `sub` and `jti` claims. Lookups go through the per-process LRU first and then
+# through the shared cache. Lookups that went to the database only add missing entries, and saving a user replaces
+# its entry with a tombstone on commit, so a request that read the row before the save cannot cache it afterwards.
+# Other processes drop their local copy after TOKEN_CACHE_LOCAL_TIMEOUT seconds, so a cached user can be stale and
+# is only saved with update_fields.
+class TokenUserCache:
+    key_prefix = 'users:token'
+    tombstone = 'deleted'
+
+    def __init__(self):
+        self._local = None
+
+    @property
+    def enabled(self):
+        return settings.TOKEN_CACHE
+
+    @property
+    def shared(self):
+        return caches[settings.TOKEN_CACHE_ALIAS]
+
+    @property
+    def local(self):
+        if self._local is None:
+            self._local = LocalCache(
+                settings.TOKEN_CACHE_LOCAL_MAX_SIZE, settings.TOKEN_CACHE_LOCAL_TIMEOUT)
+
+        return self._local
+
+    def make_key(self, sub, jti):
+        return '%s:%s:%s' % (self.key_prefix, sub, jti)
+
+    def get(self, sub, jti):
+        key = self.make_key(sub, jti)
+        value = self.local.get(key)
+
+        if value is None:
+            value = self.shared.get(key)
+
+            if value is None or value == self.tombstone:
+                return None
+
+            self.local.set(key, value)
+
+        return value
+
+    def add(self, sub, jti, value):
+        key = self.make_key(sub, jti)
+
+        if self.shared.add(key, value, settings.TOKEN_CACHE_TIMEOUT):
+            self.local.set(key, value)
+
+    def delete(self, sub, jti):
+        key = self.make_key(sub, jti)
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def invalidate(self, sub, jti):
+        key = self.make_key(sub, jti)
+        self.local.delete(key)
+        self.shared.set(key, self.tombstone, settings.TOKEN_CACHE_TOMBSTONE_TIMEOUT)
+
+
+token_user_cache = TokenUserCache()
+
+
+# The current token identifier of every username, so a token can be checked for revocation without loading the
+# user. Saves overwrite the entry on commit while lookups that went to the database only add missing entries,
+# so a stale read can never replace a newer identifier.
+class TokenIdentifierCache:
+    key_prefix = 'users:jti'
+
+    @property
+    def enabled(self):
+        return settings.TOKEN_CACHE
+
+    @property
+    def shared(self):
+        return caches[settings.TOKEN_CACHE_ALIAS]
+
+    def make_key(self, sub):
+        return '%s:%s' % (self.key_prefix, sub)
+
+    def make_value(self, user):
+        return str(user.token_identifier), str(user.pk), user.is_active
+
+    def get(self, sub):
+        return self.shared.get(self.make_key(sub))
+
+    def add(self, sub, value):
+        self.shared.add(self.make_key(sub), value, settings.TOKEN_CACHE_TIMEOUT)
+
+    def set(self, sub, value):
+        self.shared.set(self.make_key(sub), value, settings.TOKEN_CACHE_TIMEOUT)
+
+    def delete(self, sub):
+        self.shared.delete(self.make_key(sub))
+
+
+token_identifier_cache = TokenIdentifierCache()
+
+
+# Rendered public profiles by lowercased username, with the ETag and Last-Modified they are served with. Saving
+# a user or its profile deletes the entry, again on commit like the token caches.
+class ProfileResponseCache:
+    key_prefix = 'users:profile'
+
+    @property
+    def enabled(self):
+        return settings.PROFILE_CACHE
+
+    @property
+    def shared(self):
+        return caches[settings.PROFILE_CACHE_ALIAS]
+
+    def make_key(self, username):
+        return '%s:%s' % (self.key_prefix, username.lower())
+
+    def get(self, username):
+        return self.shared.get(self.make_key(username))
+
+    def get_many(self, usernames):
+        keys = {self.make_key(username): username for username in usernames}
+
+        return {keys[key]: value for key, value in self.shared.get_many(keys).items()}
+
+    def set(self, username, value):
+        self.shared.set(self.make_key(username), value, settings.PROFILE_CACHE_TIMEOUT)
+
+    def set_many(self, values):
+        self.shared.set_many({
+            self.make_key(username): value for username, value in values.items()
+        }, settings.PROFILE_CACHE_TIMEOUT)
+
+    def delete(self, username):
+        self.shared.delete(self.make_key(username))
+
+
+profile_response_cache = ProfileResponseCache()
+
+
+# The recent sign in fingerprints of each user, see UserFingerprints. Entries are only ever written with what
+# was committed to the database, so a miss can always be filled from there.
+class UserFingerprintsCache:
+    key_prefix = 'users:fingerprints'
+
+    @property
+    def shared(self):
+        return caches[settings.USER_FINGERPRINTS_CACHE_ALIAS]
+
+    def make_key(self, user_id):
+        return '%s:%s' % (self.key_prefix, user_id)
+
+    def get_many(self, user_ids):
+        keys = {self.make_key(user_id): user_id for user_id in user_ids}
+
+        return {keys[key]: value for key, value in self.shared.get_many(keys).items()}
+
+    def set_many(self, values):
+        self.shared.set_many({
+            self.make_key(user_id): value for user_id, value in values.items()
+        }, settings.USER_FINGERPRINTS_CACHE_TIMEOUT)
+
+
+user_fingerprints_cache = UserFingerprintsCache()
@@ -5,17 +5,29 @@ from django.template import loader
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
+from .models import EmailOutbox
 from .utils import email_token_generator
 
 from_email = settings.EMAIL_FROM
 
 
+# With EMAIL_OUTBOX the email is written to the outbox within the request's transaction and sent by the
+# send_queued_email management command
+def send_email(subject, body, to):
+    if settings.EMAIL_OUTBOX:
+        EmailOutbox.objects.create(
+            subject=subject, body=body, from_email=from_email, to=to)
+    else:
+        email_message = EmailMultiAlternatives(subject, body, from_email, to)
+        email_message.send()
+
+
 def send_reset_password_email(user):
     context = {
         'username': user.username,
         'site_name': settings.SITE_NAME,
         'site_url': settings.SITE_URL,
-        'uid': urlsafe_base64_encode(force_bytes(user.id)).decode(),
+        'uid': urlsafe_base64_encode(force_bytes(user.id)),
         'token': default_token_generator.make_token(user),
     }
 
@@ -25,9 +37,7 @@ def send_reset_password_email(user):
     body = loader.render_to_string(
         'registration/email/password_reset.html', context)
 
-    email_message = EmailMultiAlternatives(
-        subject, body, from_email, [user.email])
-    email_message.send()
+    send_email(subject, body, [user.email])
 
 
 def send_password_changed_email(user):
@@ -43,9 +53,7 @@ def send_password_changed_email(user):
     body = loader.render_to_string(
         'registration/email/password_changed.html', context)
 
-    email_message = EmailMultiAlternatives(
-        subject, body, from_email, [user.email])
-    email_message.send()
+    send_email(subject, body, [user.email])
 
 
 def send_email_verification(user):
@@ -53,7 +61,7 @@ def send_email_verification(user):
         'username': user.username,
         'site_name': settings.SITE_NAME,
         'site_url': settings.SITE_URL,
-        'uid': urlsafe_base64_encode(force_bytes(user.id)).decode(),
+        'uid': urlsafe_base64_encode(force_bytes(user.id)),
         'token': email_token_generator.make_token(user),
     }
 
@@ -63,6 +71,23 @@ def send_email_verification(user):
     body = loader.render_to_string(
         'registration/email/email_verification.html', context)
 
-    email_message = EmailMultiAlternatives(
-        subject, body, from_email, [user.email])
-    email_message.send()
+    send_email(subject, body, [user.email])
+
+
+def send_new_sign_in_email(user, row):
+    context = {
+        'username': user.username,
+        'site_name': settings.SITE_NAME,
+        'site_url': settings.SITE_URL,
+        'ip_address': row['ip_address'],
+        'user_agent': row['user_agent'],
+        'created_at': row['created_at'],
+    }
+
+    subject = loader.render_to_string(
+        'registration/email/new_sign_in_subject.txt', context)
+    subject = ''.join(subject.splitlines())
+    body = loader.render_to_string(
+        'registration/email/new_sign_in.html', context)
+
+    send_email(subject, body, [user.email])
@@ -0,0 +1,137 @@
+import logging
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+
+from django.conf import settings
+
+from .cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+# File written by the build_geoip command: the header, then one record per range sorted by its first address.
+# IPv4 ranges are stored as IPv4-mapped IPv6 addresses, so both families share one search.
+MAGIC = b'GEOIP\x00\x00\x01'
+HEADER = struct.Struct('>8sI')
+RECORD = struct.Struct('>16s16s2sI')
+IPV4_MAPPED_PREFIX = bytes(10) + b'\xff\xff'
+
+
+# Raises OSError for anything that is not an IP address
+def get_key(ip_address):
+    try:
+        return IPV4_MAPPED_PREFIX + socket.inet_pton(socket.AF_INET, ip_address)
+    except OSError:
+        return socket.inet_pton(socket.AF_INET6, ip_address)
+
+
+# Ranges mapped read-only, so every worker on the host shares the same pages of the page cache. Each process
+# opens the file on first use and picks up a rebuilt file within GEOIP_DATABASE_CHECK_INTERVAL seconds.
+class GeoIPDatabase:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._checked_at = None
+        self._stat = None
+        self._mmap = None
+        self._size = 0
+        self._results = None
+
+    @property
+    def results(self):
+        if self._results is None:
+            self._results = LocalCache(settings.GEOIP_CACHE_MAX_SIZE, settings.GEOIP_DATABASE_CHECK_INTERVAL)
+
+        return self._results
+
+    def open(self):
+        self._checked_at = time.monotonic()
+
+        try:
+            stat = os.stat(settings.GEOIP_DATABASE)
+            stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except (OSError, TypeError):
+            stat = None
+
+        if stat == self._stat and self._pid == os.getpid():
+            return
+
+        if self._mmap is not None:
+            self._mmap.close()
+
+        self._pid = os.getpid()
+        self._stat = stat
+        self._mmap = None
+        self._size = 0
+        self.results.clear()
+
+        if stat is None:
+            return
+
+        with open(settings.GEOIP_DATABASE, 'rb') as f:
+            magic, size = HEADER.unpack(f.read(HEADER.size).ljust(HEADER.size, b'\x00'))
+
+            if magic != MAGIC or stat[2] != HEADER.size + size * RECORD.size:
+                logger.warning('%s is not a GeoIP database.', settings.GEOIP_DATABASE)
+                return
+
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._size = size
+
+    def lookup(self, ip_address):
+        if ip_address is None:
+            return None
+
+        result = self.results.get(ip_address, False)
+
+        if result is not False:
+            return result
+
+        try:
+            key = get_key(ip_address)
+        except OSError:
+            return None
+
+        with self._lock:
+            if self._pid != os.getpid() or \
+                    time.monotonic() - self._checked_at >= settings.GEOIP_DATABASE_CHECK_INTERVAL:
+                self.open()
+
+            result = self.search(key)
+
+        self.results.set(ip_address, result)
+
+        return result
+
+    def search(self, key):
+        lo = 0
+        hi = self._size
+
+        # Last range starting at or before the address
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * RECORD.size
+
+            if self._mmap[offset:offset + 16] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo == 0:
+            return None
+
+        start, end, country, asn = RECORD.unpack_from(self._mmap, HEADER.size + (lo - 1) * RECORD.size)
+
+        if key > end:
+            return None
+
+        return {
+            'country': country.decode('ascii').strip() or None,
+            'asn': asn or None,
+        }
+
+
+geoip_database = GeoIPDatabase()
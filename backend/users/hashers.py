@@ -0,0 +1,24 @@
+import json
+import os
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+def get_argon2_parameters():
+    if not settings.ARGON2_PARAMETERS_FILE or not os.path.exists(settings.ARGON2_PARAMETERS_FILE):
+        return {}
+
+    with open(settings.ARGON2_PARAMETERS_FILE) as f:
+        return json.load(f)
+
+
+# Argon2 with the costs written by the calibrate_argon2 command, or Django's defaults until it has been run.
+# Hashes made with other costs are upgraded on the next successful sign in.
+class CalibratedArgon2PasswordHasher(Argon2PasswordHasher):
+    def __init__(self):
+        parameters = get_argon2_parameters()
+
+        self.time_cost = parameters.get('time_cost', self.time_cost)
+        self.memory_cost = parameters.get('memory_cost', self.memory_cost)
+        self.parallelism = parameters.get('parallelism', self.parallelism)
@@ -0,0 +1,96 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import exceptions, status
+
+
+class HashingUnavailable(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is too busy to process this request, please try again later.'
+    default_code = 'hashing_unavailable'
+
+
+def check_password_worker(password, encoded):
+    must_update = []
+    is_correct = hashers.check_password(password, encoded, must_update.append)
+
+    return is_correct, bool(must_update)
+
+
+# Runs password hashing in a pool of PASSWORD_HASHING_POOL processes. At most PASSWORD_HASHING_QUEUE_SIZE hashes
+# wait for a free process, further requests are rejected right away instead of queueing up. The processes are
+# forked from the worker and inherit its configured Django.
+class HashingExecutor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._slots = None
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ProcessPoolExecutor(settings.PASSWORD_HASHING_POOL)
+                self._slots = threading.BoundedSemaphore(
+                    settings.PASSWORD_HASHING_POOL + settings.PASSWORD_HASHING_QUEUE_SIZE)
+
+            return self._executor, self._slots
+
+    def reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+        executor.shutdown(wait=False)
+
+    def run(self, fn, *args):
+        executor, slots = self.get_executor()
+
+        if not slots.acquire(blocking=False):
+            raise HashingUnavailable()
+
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            slots.release()
+            self.reset(executor)
+            raise HashingUnavailable()
+
+        # The slot is held until the hash is done, even when the request gave up on it
+        future.add_done_callback(lambda future: slots.release())
+
+        try:
+            return future.result(timeout=settings.PASSWORD_HASHING_TIMEOUT)
+        except TimeoutError:
+            raise HashingUnavailable()
+        except BrokenProcessPool:
+            self.reset(executor)
+            raise HashingUnavailable()
+
+
+hashing_executor = HashingExecutor()
+
+
+def make_password(password):
+    if not settings.PASSWORD_HASHING_POOL:
+        return hashers.make_password(password)
+
+    return hashing_executor.run(hashers.make_password, password)
+
+
+def check_password(password, encoded, setter=None):
+    if not settings.PASSWORD_HASHING_POOL:
+        return hashers.check_password(password, encoded, setter)
+
+    is_correct, must_update = hashing_executor.run(
+        check_password_worker, password, encoded)
+
+    if setter and is_correct and must_update:
+        setter(password)
+
+    return is_correct
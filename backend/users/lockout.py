@@ -0,0 +1,55 @@
+import hashlib
+import time
+
+from django.conf import settings
+
+from .models import SignInFailure
+
+
+# Counts failed sign ins per account and per IP address in the users_sign_in_failures table of
+# THROTTLE_DATABASE. Once a counter reaches its threshold further sign ins are rejected before any password is
+# hashed, for SIGN_IN_LOCKOUT_DURATION seconds after the last failure, doubled on every failure past the
+# threshold.
+class SignInLockout:
+    key_prefix = 'users:signin'
+
+    def __init__(self, username, ip_address):
+        self.user_key = self.make_key('user', username.lower())
+        self.thresholds = {
+            self.user_key: settings.SIGN_IN_LOCKOUT_USER_THRESHOLD,
+        }
+
+        if ip_address is not None:
+            self.thresholds[self.make_key('ip', ip_address)] = settings.SIGN_IN_LOCKOUT_IP_THRESHOLD
+
+        self.failures = SignInFailure.objects.get_many(
+            self.thresholds.keys(), time.time(), settings.SIGN_IN_LOCKOUT_MAX_DURATION)
+
+    def make_key(self, kind, value):
+        return '%s:%s:%s' % (self.key_prefix, kind, hashlib.sha1(value.encode('utf-8')).hexdigest())
+
+    def get_duration(self, failures, threshold):
+        duration = settings.SIGN_IN_LOCKOUT_DURATION * 2 ** (failures - threshold)
+
+        return min(duration, settings.SIGN_IN_LOCKOUT_MAX_DURATION)
+
+    def get_wait(self):
+        now = time.time()
+        wait = 0
+
+        for key, (failures, last_failure) in self.failures.items():
+            threshold = self.thresholds[key]
+
+            if failures >= threshold:
+                wait = max(wait, last_failure +
+                           self.get_duration(failures, threshold) - now)
+
+        return wait
+
+    def register_failure(self):
+        SignInFailure.objects.add(self.thresholds.keys(), time.time(), settings.SIGN_IN_LOCKOUT_MAX_DURATION)
+
+    def reset(self):
+        # Only the account, an attacker could otherwise clear its IP address with an account of its own
+        if self.user_key in self.failures:
+            SignInFailure.objects.using(settings.THROTTLE_DATABASE).filter(key=self.user_key).delete()
@@ -0,0 +1,80 @@
+import csv
+import ipaddress
+import os
+import re
+import struct
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.users.geoip import HEADER, MAGIC, RECORD, get_key
+
+
+# Each range comes with the line it was read from, for the error messages
+def read_ranges(path):
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+
+        for row in reader:
+            if row.get('network'):
+                network = ipaddress.ip_network(row['network'], strict=False)
+                start, end = str(network[0]), str(network[-1])
+            else:
+                start, end = row['start'], row['end']
+
+            yield (get_key(start), get_key(end), (row.get('country') or '').upper(), int(row.get('asn') or 0),
+                   reader.line_num)
+
+
+def get_address(key):
+    ip_address = ipaddress.IPv6Address(key)
+
+    return ip_address.ipv4_mapped or ip_address
+
+
+class Command(BaseCommand):
+    help = 'Builds the GeoIP database from a CSV of address ranges with country and asn columns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path',
+                            help='CSV file with either a network column or start and end columns.')
+        parser.add_argument('--output', default=settings.GEOIP_DATABASE,
+                            help='File the database is written to.')
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError('Please pass --output or set GEOIP_DATABASE.')
+
+        try:
+            ranges = sorted(read_ranges(options['path']))
+        except (KeyError, ValueError, OSError) as exc:
+            raise CommandError('Invalid range: %s' % exc)
+
+        records = []
+
+        for (start, end, country, asn, line), following in zip(ranges, ranges[1:] + [None]):
+            if start > end or following is not None and following[0] <= end:
+                raise CommandError('The range %s - %s is empty or overlaps the next one.' % (
+                    get_address(start), get_address(end)))
+
+            if country and not re.fullmatch('[A-Z]{2}', country):
+                raise CommandError('%s is not a two letter country code.' % country)
+
+            try:
+                records.append(RECORD.pack(start, end, country.encode('ascii'), asn))
+            except struct.error as exc:
+                raise CommandError('Invalid range on line %d: %s' % (line, exc))
+
+        # Written next to the database and renamed over it, workers keep reading the old file until they reopen it
+        path = options['output'] + '.tmp'
+
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(ranges)))
+
+            for record in records:
+                f.write(record)
+
+        os.replace(path, options['output'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Wrote %d ranges to %s.' % (len(ranges), os.path.relpath(options['output']))))
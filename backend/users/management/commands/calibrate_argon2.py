@@ -0,0 +1,107 @@
+import json
+import math
+import os
+import time
+
+import argon2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def get_percentile(latencies, percentile):
+    latencies = sorted(latencies)
+
+    return latencies[max(math.ceil(len(latencies) * percentile / 100) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = 'Finds the Argon2 costs that hash a password within the target latency on this host.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', type=float, default=250,
+                            help='Latency budget in milliseconds.')
+        parser.add_argument('--percentile', type=float, default=90,
+                            help='Percentile of the latencies that has to fit in the budget.')
+        parser.add_argument('--max-memory', type=int, default=65536,
+                            help='Largest memory cost to try, in KiB.')
+        parser.add_argument('--parallelism', type=int, default=2,
+                            help='Number of lanes, usually the number of cores available to a worker.')
+        parser.add_argument('--samples', type=int, default=10,
+                            help='Number of hashes timed for each candidate.')
+        parser.add_argument('--output', default=settings.ARGON2_PARAMETERS_FILE,
+                            help='File the parameters are written to.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Print the parameters without writing them.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.samples = options['samples']
+        self.percentile = options['percentile']
+        target = options['target']
+        parallelism = options['parallelism']
+        memory_cost = options['max_memory']
+        time_cost = 1
+
+        # Argon2 needs at least 8 KiB per lane
+        if memory_cost < 8 * parallelism:
+            raise CommandError('The memory cost has to be at least %d KiB.' % (8 * parallelism))
+
+        # Memory is what makes a guess expensive on dedicated hardware, so it is lowered first
+        while self.measure(time_cost, memory_cost, parallelism) > target:
+            if memory_cost // 2 < 8 * parallelism:
+                raise CommandError('No parameters fit in %.0fms on this host.' % target)
+
+            memory_cost //= 2
+
+        while self.measure(time_cost + 1, memory_cost, parallelism) <= target:
+            time_cost += 1
+
+        parameters = {
+            'time_cost': time_cost,
+            'memory_cost': memory_cost,
+            'parallelism': parallelism,
+        }
+
+        latencies = self.get_latencies(time_cost, memory_cost, parallelism)
+
+        self.stdout.write('time_cost=%d memory_cost=%d parallelism=%d' % (
+            time_cost, memory_cost, parallelism))
+
+        for name, percentile in (('min', 0), ('p50', 50), ('p90', 90), ('p99', 99), ('max', 100)):
+            self.stdout.write('%s %.1fms' % (name, get_percentile(latencies, percentile)))
+
+        if options['dry_run']:
+            return
+
+        with open(options['output'], 'w') as f:
+            json.dump(parameters, f, indent=2)
+            f.write('\n')
+
+        self.stdout.write(self.style.SUCCESS(
+            'Wrote %s.' % os.path.relpath(options['output'])))
+
+    def measure(self, time_cost, memory_cost, parallelism):
+        latencies = self.get_latencies(time_cost, memory_cost, parallelism)
+        latency = get_percentile(latencies, self.percentile)
+
+        if self.verbosity > 1:
+            self.stdout.write('time_cost=%d memory_cost=%d parallelism=%d p%g %.1fms' % (
+                time_cost, memory_cost, parallelism, self.percentile, latency))
+
+        return latency
+
+    def get_latencies(self, time_cost, memory_cost, parallelism):
+        latencies = []
+
+        for i in range(self.samples):
+            secret = os.urandom(16)
+            salt = os.urandom(16)
+            start = time.perf_counter()
+
+            argon2.low_level.hash_secret(
+                secret, salt, time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism,
+                hash_len=argon2.DEFAULT_HASH_LENGTH, type=argon2.low_level.Type.I)
+
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        return latencies
@@ -0,0 +1,23 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.users.models import SignInFailure, Throttle
+
+
+class Command(BaseCommand):
+    help = 'Deletes the throttles and sign in failures that no longer limit anything.'
+
+    def handle(self, *args, **options):
+        now = time.time()
+
+        deleted, _ = Throttle.objects.using(settings.THROTTLE_DATABASE).filter(
+            tat__lt=now).delete()
+
+        self.stdout.write('Deleted %d throttles.' % deleted)
+
+        deleted, _ = SignInFailure.objects.using(settings.THROTTLE_DATABASE).filter(
+            last_failure__lt=now - settings.SIGN_IN_LOCKOUT_MAX_DURATION).delete()
+
+        self.stdout.write('Deleted %d sign in failures.' % deleted)
@@ -0,0 +1,235 @@
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework import serializers
+
+from backend.users.managers import get_insert_values
+from backend.users.models import User, UserPrimaryEmail, UserProfile
+from backend.users.serializers import SignUpSerializer
+from backend.users.usernames import username_policy
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def read_ndjson(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def get_copy_value(value):
+    if value is None:
+        return '\\N'
+
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class Command(BaseCommand):
+    help = 'Imports users from a CSV or NDJSON file with username, email, password, location and bio fields.'
+
+    models = (User, UserProfile, UserPrimaryEmail)
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import.')
+        parser.add_argument('--format', choices=('csv', 'ndjson'),
+                            help='Format of the file, guessed from its extension by default.')
+        parser.add_argument('--hashed', action='store_true',
+                            help='The passwords are already hashed by one of the PASSWORD_HASHERS.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Number of processes hashing passwords, 0 hashes them in this process.')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Number of users loaded per transaction.')
+        parser.add_argument('--checkpoint',
+                            help='File recording the progress, defaults to the path with .checkpoint appended.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint and start from the first row.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        checkpoint = options['checkpoint'] or path + '.checkpoint'
+        readers = {
+            'csv': read_csv,
+            'ndjson': read_ndjson,
+            'jsonl': read_ndjson,
+        }
+
+        if file_format not in readers:
+            raise CommandError('Unknown file format, please pass --format.')
+
+        start = 0
+
+        if os.path.exists(checkpoint) and not options['restart']:
+            with open(checkpoint) as f:
+                start = json.load(f)['rows']
+
+            self.stdout.write('Resuming after row %d.' % start)
+
+        self.hashed = options['hashed']
+        self.executor = None
+        # Rows go through the username and email checks of signing up
+        self.fields = SignUpSerializer().fields
+
+        if not self.hashed and options['workers']:
+            # Forked workers inherit the configured Django
+            self.executor = ProcessPoolExecutor(options['workers'])
+
+        self.create_staging_tables()
+
+        rows = islice(readers[file_format](path), start, None)
+        processed = start
+        imported = 0
+        skipped = 0
+        started_at = time.monotonic()
+
+        try:
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+
+                if not chunk:
+                    break
+
+                chunk_imported, chunk_skipped = self.import_chunk(chunk)
+                processed += len(chunk)
+                imported += chunk_imported
+                skipped += chunk_skipped
+
+                # Written once the chunk is committed, a chunk that is loaded twice only hits the conflicts
+                with open(checkpoint, 'w') as f:
+                    json.dump({'rows': processed}, f)
+
+                self.stdout.write('%d rows processed, %d users imported, %d skipped, %.0f rows/s.' % (
+                    processed, imported, skipped, (processed - start) / (time.monotonic() - started_at)))
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d users, %d rows were invalid or already exist.' % (imported, skipped)))
+
+    def get_staging_table(self, model):
+        return 'import_%s' % model._meta.db_table
+
+    def create_staging_tables(self):
+        with connection.cursor() as cursor:
+            for model in self.models:
+                columns = self.get_columns(model)
+
+                cursor.execute('CREATE TEMPORARY TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS AS '
+                               'SELECT {columns} FROM {table} WITH NO DATA'.format(
+                                   staging=self.get_staging_table(model),
+                                   columns=', '.join(columns),
+                                   table=connection.ops.quote_name(model._meta.db_table)))
+
+    def get_columns(self, model):
+        columns, values = get_insert_values(model(), connection)
+
+        return columns
+
+    def get_passwords(self, passwords):
+        if self.hashed:
+            for password in passwords:
+                identify_hasher(password)
+
+            return passwords
+
+        if self.executor is None:
+            return [make_password(password) for password in passwords]
+
+        return list(self.executor.map(make_password, passwords, chunksize=64))
+
+    # Invalid rows are skipped rather than failing the COPY of their chunk
+    def get_user(self, row):
+        try:
+            username = self.fields['username'].run_validation(row.get('username'))
+            username_policy.validate(username)
+            email = self.fields['email'].run_validation(row.get('email'))
+        except serializers.ValidationError:
+            return None
+
+        password = row.get('password')
+        location = row.get('location') or ''
+
+        if not password or len(location) > UserProfile._meta.get_field('location').max_length:
+            return None
+
+        if self.hashed and len(password) > User._meta.get_field('password').max_length:
+            return None
+
+        return User(username=User.normalize_username(username), email=User.objects.normalize_email(email))
+
+    def import_chunk(self, chunk):
+        users = []
+
+        for row in chunk:
+            user = self.get_user(row)
+
+            if user is not None:
+                users.append((user, row))
+
+        try:
+            passwords = self.get_passwords([row['password'] for user, row in users])
+        except ValueError:
+            raise CommandError('A password is not hashed by any of the PASSWORD_HASHERS.')
+
+        buffers = {model: io.StringIO() for model in self.models}
+
+        for (user, row), password in zip(users, passwords):
+            user.password = password
+            objs = (
+                user,
+                UserProfile(user=user, location=row.get('location') or '', bio=row.get('bio') or ''),
+                UserPrimaryEmail(user=user),
+            )
+
+            for obj in objs:
+                columns, values = get_insert_values(obj, connection)
+                buffers[type(obj)].write('\t'.join(get_copy_value(value) for value in values) + '\n')
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model, buffer in buffers.items():
+                buffer.seek(0)
+                cursor.copy_expert('COPY {staging} FROM STDIN'.format(
+                    staging=self.get_staging_table(model)), buffer)
+
+            user_columns = ', '.join(self.get_columns(User))
+            statements = []
+
+            for model in (UserProfile, UserPrimaryEmail):
+                statements.append('INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} '
+                                  'WHERE user_id IN (SELECT id FROM new_users)'.format(
+                                      table=connection.ops.quote_name(model._meta.db_table),
+                                      columns=', '.join(self.get_columns(model)),
+                                      staging=self.get_staging_table(model)))
+
+            # Users whose username or email address already exists are left out, with their profile and email
+            cursor.execute(
+                'WITH new_users AS (INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} '
+                'ON CONFLICT DO NOTHING RETURNING id), new_profiles AS ({}), new_primary_emails AS ({}) '
+                'SELECT count(*) FROM new_users'.format(
+                    *statements,
+                    table=connection.ops.quote_name(User._meta.db_table),
+                    columns=user_columns,
+                    staging=self.get_staging_table(User)))
+
+            imported = cursor.fetchone()[0]
+
+        return imported, len(chunk) - imported
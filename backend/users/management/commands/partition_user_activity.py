@@ -0,0 +1,108 @@
+import re
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from backend.users.models import UserActivity, UserActivityAddress, UserActivityDay
+
+
+def get_month(value, offset=0):
+    month = value.year * 12 + value.month - 1 + offset
+
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    help = 'Creates the monthly partitions of the user activity table ahead of time and drops expired activity.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.USER_ACTIVITY_PARTITIONS_AHEAD,
+                            help='Number of future months to create partitions for.')
+        parser.add_argument('--retention', type=int, default=settings.USER_ACTIVITY_RETENTION,
+                            help='Number of past months to keep besides the current one, 0 keeps every month.')
+        parser.add_argument('--brin', action='store_true',
+                            help='Add a BRIN index on created_at to every partition.')
+
+    def handle(self, *args, **options):
+        self.table = UserActivity._meta.db_table
+        self.default_partition = '%s_default' % self.table
+        now = datetime.now(tz=timezone.utc)
+
+        for offset in range(options['months_ahead'] + 1):
+            self.create_partition(get_month(now, offset))
+
+        if options['retention']:
+            self.drop_partitions(get_month(now, -options['retention']))
+
+        if options['brin']:
+            with connection.cursor() as cursor:
+                cursor.execute('CREATE INDEX IF NOT EXISTS {table}_created_brin ON {table} '
+                               'USING brin (created_at)'.format(table=self.table))
+
+    def get_partitions(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+                           'WHERE i.inhparent = %s::regclass', [self.table])
+
+            partitions = {}
+
+            for name, in cursor.fetchall():
+                match = re.fullmatch(r'%s_(\d{4})_(\d{2})' % self.table, name)
+
+                if match is not None:
+                    partitions[name] = datetime(
+                        int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+
+            return partitions
+
+    def create_partition(self, start):
+        name = '%s_%s' % (self.table, start.strftime('%Y_%m'))
+        end = get_month(start, 1)
+
+        if name in self.get_partitions():
+            return
+
+        # PostgreSQL 11 takes only literals as partition bounds, not the casts of query parameters
+        create_sql = "CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')".format(
+            name=name, table=self.table, start=start.isoformat(), end=end.isoformat())
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM {default} WHERE created_at >= %s AND created_at < %s)'.format(
+                default=self.default_partition), [start, end])
+
+            if not cursor.fetchone()[0]:
+                cursor.execute(create_sql)
+            else:
+                # Rows of the month already went to the default partition, they are moved to the new one
+                cursor.execute('ALTER TABLE {table} DETACH PARTITION {default}'.format(
+                    table=self.table, default=self.default_partition))
+                cursor.execute(create_sql)
+                cursor.execute('WITH moved AS (DELETE FROM {default} WHERE created_at >= %s AND created_at < %s '
+                               'RETURNING *) INSERT INTO {table} SELECT * FROM moved'.format(
+                                   table=self.table, default=self.default_partition), [start, end])
+                cursor.execute('ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT'.format(
+                    table=self.table, default=self.default_partition))
+
+        self.stdout.write('Created partition %s.' % name)
+
+    def drop_partitions(self, cutoff):
+        for name, start in sorted(self.get_partitions().items()):
+            if start >= cutoff:
+                continue
+
+            # Dropping a whole month leaves nothing to vacuum, unlike deleting its rows
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('ALTER TABLE {table} DETACH PARTITION {name}'.format(table=self.table, name=name))
+                cursor.execute('DROP TABLE {name}'.format(name=name))
+
+            self.stdout.write('Dropped partition %s.' % name)
+
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {default} WHERE created_at < %s'.format(
+                default=self.default_partition), [cutoff])
+
+        # The rollups follow the same retention
+        UserActivityDay.objects.filter(date__lt=cutoff.date()).delete()
+        UserActivityAddress.objects.filter(last_seen__lt=cutoff).delete()
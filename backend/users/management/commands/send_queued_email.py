@@ -0,0 +1,80 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from backend.users.models import EmailOutbox
+
+
+class Command(BaseCommand):
+    help = 'Sends the emails queued in the outbox, several workers can run at once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+                            help='Number of emails sent over one connection.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to wait when no email is due.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no email is due.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.send_batch(options['batch_size'])
+
+            if sent or failed:
+                self.stdout.write('Sent %d emails, %d failed.' % (sent, failed))
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['interval'])
+
+    def send_batch(self, batch_size):
+        now = timezone.now()
+
+        # The rows stay locked until the batch is done, other workers skip them
+        with transaction.atomic():
+            emails = list(EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+                next_attempt_at__lte=now, attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+            ).order_by('next_attempt_at')[:batch_size])
+
+            if not emails:
+                return 0, 0
+
+            sent = []
+            failed = []
+            connection = get_connection()
+
+            try:
+                connection.open()
+            except Exception as exc:
+                failed = [(email, exc) for email in emails]
+            else:
+                for email in emails:
+                    email_message = EmailMultiAlternatives(
+                        email.subject, email.body, email.from_email, email.to, connection=connection)
+
+                    try:
+                        connection.send_messages([email_message])
+                    except Exception as exc:
+                        failed.append((email, exc))
+                    else:
+                        sent.append(email.pk)
+            finally:
+                connection.close()
+
+            for email, exc in failed:
+                delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** email.attempts
+                email.attempts += 1
+                email.last_error = str(exc)
+                email.next_attempt_at = now + timedelta(
+                    seconds=min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+            EmailOutbox.objects.filter(pk__in=sent).delete()
+            EmailOutbox.objects.bulk_update(
+                [email for email, exc in failed], ['attempts', 'last_error', 'next_attempt_at'])
+
+        return len(sent), len(failed)
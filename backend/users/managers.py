@@ -1,6 +1,259 @@
+from django.conf import settings
 from django.contrib.auth.models import UserManager
+from django.db import connections, models, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .cache import LocalCache
+from .utils import parse_user_agent
+
+# Lets queries filter on lower(username) and lower(email), which have unique indexes
+models.CharField.register_lookup(Lower)
+
+
+def get_insert_values(obj, connection):
+    fields = [field for field in obj._meta.concrete_fields if not isinstance(field, models.AutoField)]
+    values = [field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields]
+
+    return [connection.ops.quote_name(field.column) for field in fields], values
 
 
 class CustomUserManager(UserManager):
     def get_by_natural_key(self, username):
-        return self.get(username__iexact=username)
+        return self.get(username__lower=username.lower())
+
+    # Users without an email address are left out of its index
+    def filter_by_email(self, email):
+        return self.filter(email__lower=email.lower()).exclude(email='')
+
+    # Active usernames starting with `prefix` regardless of case, the range scan and the order both come from the
+    # users_username_lower_c index
+    def search_usernames(self, prefix, limit):
+        connection = connections[self.db]
+        pattern = prefix.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT username FROM {table} WHERE lower(username) COLLATE "C" LIKE %s AND is_active '
+                'ORDER BY lower(username) COLLATE "C" LIMIT %s'.format(
+                    table=connection.ops.quote_name(self.model._meta.db_table)), [pattern, limit])
+
+            return [username for username, in cursor.fetchall()]
+
+    # Inserts the user, its profile and its primary email in one statement instead of create_user and the
+    # post_save receivers. Returns None when the username or email address is taken regardless of case, see
+    # get_conflicts.
+    def create_account(self, username, email, password):
+        connection = connections[self.db]
+        user = self.model(username=self.model.normalize_username(username),
+                          email=self.normalize_email(email))
+        user.set_password(password)
+
+        profile = self.model._meta.get_field('profile').related_model(user=user)
+        primary_email = self.model._meta.get_field('primary_email').related_model(user=user)
+        statements = []
+        params = []
+
+        for obj in (user, profile, primary_email):
+            columns, values = get_insert_values(obj, connection)
+
+            if obj is user:
+                statements.append('INSERT INTO {table} ({columns}) VALUES ({values}) ON CONFLICT DO NOTHING '
+                                  'RETURNING {pk}'.format(
+                                      table=connection.ops.quote_name(obj._meta.db_table),
+                                      columns=', '.join(columns),
+                                      values=', '.join(['%s'] * len(values)),
+                                      pk=connection.ops.quote_name(obj._meta.pk.column)))
+            else:
+                # Only inserted when the user was
+                statements.append('INSERT INTO {table} ({columns}) SELECT {values} FROM new_user'.format(
+                    table=connection.ops.quote_name(obj._meta.db_table),
+                    columns=', '.join(columns),
+                    values=', '.join(['%s'] * len(values))))
+
+            params.extend(values)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'WITH new_user AS ({}), new_profile AS ({}), new_primary_email AS ({}) '
+                'SELECT 1 FROM new_user'.format(*statements), params)
+
+            if cursor.fetchone() is None:
+                return None
+
+        user._state.adding = False
+        user._state.db = self.db
+
+        return user
+
+    def get_conflicts(self, username, email):
+        username = self.model.normalize_username(username)
+        email = self.normalize_email(email)
+        conflicts = set()
+
+        users = self.filter(username__lower=username.lower()).union(self.filter_by_email(email))
+
+        for existing_username, existing_email in users.values_list('username', 'email'):
+            if existing_username.lower() == username.lower():
+                conflicts.add('username')
+
+            if existing_email.lower() == email.lower():
+                conflicts.add('email')
+
+        return conflicts
+
+
+class ThrottleManager(models.Manager):
+    # Generic cell rate algorithm, a key is allowed while its theoretical arrival time stays within `duration` of
+    # now. Returns False when the request is throttled, in which case the row is left untouched.
+    def acquire(self, key, now, interval, duration):
+        table = self.model._meta.db_table
+
+        with connections[settings.THROTTLE_DATABASE].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (key, tat) VALUES (%(key)s, %(now)s + %(interval)s) '
+                'ON CONFLICT (key) DO UPDATE SET tat = GREATEST({table}.tat, %(now)s) + %(interval)s '
+                'WHERE GREATEST({table}.tat, %(now)s) + %(interval)s - %(now)s <= %(duration)s '
+                'RETURNING tat'.format(table=table),
+                {'key': key, 'now': now, 'interval': interval, 'duration': duration})
+
+            return cursor.fetchone() is not None
+
+
+class SignInFailureManager(models.Manager):
+    # Failures of each key whose last failure is less than `expire` seconds old
+    def get_many(self, keys, now, expire):
+        failures = self.using(settings.THROTTLE_DATABASE).filter(
+            key__in=keys, last_failure__gte=now - expire).values_list('key', 'failures', 'last_failure')
+
+        return {key: (count, last_failure) for key, count, last_failure in failures}
+
+    # Counts a failure for every key in one statement, keys whose last failure expired start over at one.
+    # Sorted so that concurrent failures lock the rows in the same order.
+    def add(self, keys, now, expire):
+        keys = sorted(keys)
+        table = self.model._meta.db_table
+
+        with connections[settings.THROTTLE_DATABASE].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (key, failures, last_failure) VALUES {values} '
+                'ON CONFLICT (key) DO UPDATE SET failures = CASE WHEN {table}.last_failure < %s THEN 1 '
+                'ELSE {table}.failures + 1 END, last_failure = EXCLUDED.last_failure'.format(
+                    table=table, values=', '.join(['(%s, 1, %s)'] * len(keys))),
+                [value for key in keys for value in (key, now)] + [now - expire])
+
+
+class UserActivityDayManager(models.Manager):
+    # Adds activity rows to the logins and last seen time of each user and day, in one statement per batch
+    def add(self, rows):
+        days = {}
+
+        for row in rows:
+            key = (row['user_id'], timezone.localdate(row['created_at']))
+            logins, last_seen = days.get(key, (0, row['created_at']))
+            days[key] = (logins + 1, max(last_seen, row['created_at']))
+
+        if not days:
+            return
+
+        table = self.model._meta.db_table
+
+        # Sorted so that concurrent batches lock the rows in the same order
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (user_id, date, logins, last_seen) VALUES {values} '
+                'ON CONFLICT (user_id, date) DO UPDATE SET logins = {table}.logins + EXCLUDED.logins, '
+                'last_seen = GREATEST({table}.last_seen, EXCLUDED.last_seen)'.format(
+                    table=table, values=', '.join(['(%s, %s, %s, %s)'] * len(days))),
+                [value for (user_id, date), (logins, last_seen) in sorted(days.items())
+                 for value in (user_id, date, logins, last_seen)])
+
+
+class UserActivityAddressManager(models.Manager):
+    # Adds activity rows to the logins and first and last seen times of each user and IP address
+    def add(self, rows):
+        addresses = {}
+
+        for row in rows:
+            if row['ip_address'] is None:
+                continue
+
+            key = (row['user_id'], row['ip_address'])
+            logins, first_seen, last_seen = addresses.get(key, (0, row['created_at'], row['created_at']))
+            addresses[key] = (logins + 1, min(first_seen, row['created_at']), max(last_seen, row['created_at']))
+
+        if not addresses:
+            return
+
+        table = self.model._meta.db_table
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (user_id, ip_address, logins, first_seen, last_seen) VALUES {values} '
+                'ON CONFLICT (user_id, ip_address) DO UPDATE SET logins = {table}.logins + EXCLUDED.logins, '
+                'first_seen = LEAST({table}.first_seen, EXCLUDED.first_seen), '
+                'last_seen = GREATEST({table}.last_seen, EXCLUDED.last_seen)'.format(
+                    table=table, values=', '.join(['(%s, %s, %s, %s, %s)'] * len(addresses))),
+                [value for (user_id, ip_address), (logins, first_seen, last_seen) in sorted(addresses.items())
+                 for value in (user_id, ip_address, logins, first_seen, last_seen)])
+
+
+class UserFingerprintsManager(models.Manager):
+    def get_many(self, user_ids):
+        return dict(self.filter(user_id__in=user_ids).values_list('user_id', 'fingerprints'))
+
+    def set_many(self, values):
+        table = self.model._meta.db_table
+        now = timezone.now()
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (user_id, fingerprints, updated_at) VALUES {values} '
+                'ON CONFLICT (user_id) DO UPDATE SET fingerprints = EXCLUDED.fingerprints, '
+                'updated_at = EXCLUDED.updated_at'.format(
+                    table=table, values=', '.join(['(%s, %s::bigint[], %s)'] * len(values))),
+                [value for user_id, fingerprints in sorted(values.items())
+                 for value in (user_id, list(fingerprints), now)])
+
+
+class UserAgentManager(models.Manager):
+    def __init__(self):
+        super().__init__()
+        self._ids = None
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = LocalCache(settings.USER_AGENT_CACHE_MAX_SIZE, None)
+
+        return self._ids
+
+    def set_ids(self, ids):
+        for value, pk in ids.items():
+            self.ids.set(value, pk)
+
+    # Maps user agent strings to their ids, inserting and parsing the ones seen for the first time. Ids never
+    # change, so they are kept in a per-process LRU.
+    def get_ids(self, values):
+        ids = {}
+        missing = set()
+
+        for value in set(values):
+            if value is not None:
+                ids[value] = self.ids.get(value)
+
+                if ids[value] is None:
+                    missing.add(value)
+
+        if missing:
+            self.bulk_create([
+                self.model(value=value, **parse_user_agent(value)) for value in sorted(missing)
+            ], ignore_conflicts=True)
+
+            found = dict(self.filter(value__in=missing).values_list('value', 'pk'))
+            ids.update(found)
+
+            # A rolled back transaction would leave ids of rows that do not exist in the cache
+            transaction.on_commit(lambda: self.set_ids(found), using=self.db)
+
+        return ids
@@ -0,0 +1,25 @@
+# Generated by Django 3.0.1 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Throttle',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('tat', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'throttle',
+                'verbose_name_plural': 'throttles',
+                'db_table': 'users_throttles',
+            },
+        ),
+    ]
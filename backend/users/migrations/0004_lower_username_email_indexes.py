@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_email_unique'),
+    ]
+
+    # Case-insensitive uniqueness replacing users_email_unique, also used by the username__lower and email__lower
+    # lookups and as the conflict targets of CustomUserManager.create_account
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='user',
+            name='users_email_unique',
+        ),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX users_username_lower ON users (lower(username));',
+            'DROP INDEX users_username_lower;',
+        ),
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX users_email_lower ON users (lower(email)) WHERE email <> '';",
+            'DROP INDEX users_email_lower;',
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_lower_username_email_indexes'),
+    ]
+
+    # Byte ordered, so LIKE 'prefix%' is a range scan that also returns the usernames in order
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX users_username_lower_c ON users ((lower(username) COLLATE "C"));',
+            'DROP INDEX users_username_lower_c;',
+        ),
+    ]
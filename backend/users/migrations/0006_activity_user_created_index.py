@@ -0,0 +1,17 @@
+# Generated by Django 3.0.1 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_username_prefix_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='users_activity_user_created'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# Monthly partitions from the oldest row to next month, older and later rows fall into users_activity_default
+# until `python manage.py partition_user_activity` creates their partition. Partitioned tables need the
+# partition key in the primary key, so it becomes (id, created_at).
+PARTITION_SQL = '''
+ALTER TABLE users_activity RENAME TO users_activity_unpartitioned;
+
+CREATE TABLE users_activity (LIKE users_activity_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (created_at);
+
+DO $$
+DECLARE
+    partition_start timestamptz := date_trunc(
+        'month', coalesce((SELECT min(created_at) FROM users_activity_unpartitioned), now()) AT TIME ZONE 'UTC'
+    ) AT TIME ZONE 'UTC';
+BEGIN
+    WHILE partition_start <= date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + interval '1 month'
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF users_activity FOR VALUES FROM (%L) TO (%L)',
+            'users_activity_' || to_char(partition_start AT TIME ZONE 'UTC', 'YYYY_MM'),
+            partition_start, partition_start + interval '1 month'
+        );
+        partition_start := partition_start + interval '1 month';
+    END LOOP;
+END $$;
+
+CREATE TABLE users_activity_default PARTITION OF users_activity DEFAULT;
+
+INSERT INTO users_activity SELECT * FROM users_activity_unpartitioned;
+
+DROP TABLE users_activity_unpartitioned;
+
+ALTER TABLE users_activity ADD PRIMARY KEY (id, created_at);
+ALTER TABLE users_activity ADD CONSTRAINT users_activity_user_id_fk_users_id FOREIGN KEY (user_id)
+    REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX users_activity_user_created ON users_activity (user_id, created_at DESC, id DESC);
+'''
+
+UNPARTITION_SQL = '''
+ALTER TABLE users_activity RENAME TO users_activity_partitioned;
+
+CREATE TABLE users_activity (LIKE users_activity_partitioned INCLUDING DEFAULTS);
+
+INSERT INTO users_activity SELECT * FROM users_activity_partitioned;
+
+DROP TABLE users_activity_partitioned;
+
+ALTER TABLE users_activity ADD PRIMARY KEY (id);
+ALTER TABLE users_activity ADD CONSTRAINT users_activity_user_id_fk_users_id FOREIGN KEY (user_id)
+    REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX users_activity_user_created ON users_activity (user_id, created_at DESC, id DESC);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_activity_user_created_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 3.0.1 on 2026-10-18 18:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_partition_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivityDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('logins', models.PositiveIntegerField(default=0)),
+                ('last_seen', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'user activity day',
+                'verbose_name_plural': 'user activity days',
+                'db_table': 'users_activity_days',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserActivityAddress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(unpack_ipv4=True, verbose_name='IP address')),
+                ('logins', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'user activity address',
+                'verbose_name_plural': 'user activity addresses',
+                'db_table': 'users_activity_addresses',
+                'ordering': ['-last_seen'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='useractivityday',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='users_activity_days_user_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='useractivityaddress',
+            constraint=models.UniqueConstraint(fields=('user', 'ip_address'), name='users_activity_addresses_user_ip'),
+        ),
+        migrations.RunSQL(
+            "INSERT INTO users_activity_days (user_id, date, logins, last_seen) "
+            "SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, count(*), max(created_at) FROM users_activity "
+            "GROUP BY 1, 2;",
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            "INSERT INTO users_activity_addresses (user_id, ip_address, logins, first_seen, last_seen) "
+            "SELECT user_id, ip_address, count(*), min(created_at), max(created_at) FROM users_activity "
+            "WHERE ip_address IS NOT NULL GROUP BY 1, 2;",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from backend.users.utils import parse_user_agent
+
+
+def forwards(apps, schema_editor):
+    UserActivity = apps.get_model('users', 'UserActivity')
+    UserAgent = apps.get_model('users', 'UserAgent')
+
+    values = UserActivity.objects.exclude(user_agent_string=None).values_list(
+        'user_agent_string', flat=True).order_by().distinct()
+
+    UserAgent.objects.bulk_create([
+        UserAgent(value=value, **parse_user_agent(value)) for value in values.iterator()
+    ], batch_size=1000)
+
+    with schema_editor.connection.cursor() as cursor:
+        # Checks the foreign key right away, pending checks would block dropping the old column
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute('UPDATE users_activity SET user_agent_id = users_agents.id FROM users_agents '
+                       'WHERE users_agents.value = users_activity.user_agent_string')
+
+
+def backwards(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('UPDATE users_activity SET user_agent_string = users_agents.value FROM users_agents '
+                       'WHERE users_agents.id = users_activity.user_agent_id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_activity_rollups'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='useractivity',
+            old_name='user_agent',
+            new_name='user_agent_string',
+        ),
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=255, unique=True)),
+                ('browser', models.CharField(max_length=50)),
+                ('os', models.CharField(max_length=50, verbose_name='OS')),
+                ('device', models.CharField(max_length=50)),
+            ],
+            options={
+                'verbose_name': 'user agent',
+                'verbose_name_plural': 'user agents',
+                'db_table': 'users_agents',
+            },
+        ),
+        migrations.AddField(
+            model_name='useractivity',
+            name='user_agent',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='users.UserAgent'),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name='useractivity',
+            name='user_agent_string',
+        ),
+    ]
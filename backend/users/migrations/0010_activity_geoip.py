@@ -0,0 +1,23 @@
+# Generated by Django 3.0.1 on 2026-10-18 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_user_agents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useractivity',
+            name='asn',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='ASN'),
+        ),
+        migrations.AddField(
+            model_name='useractivity',
+            name='country',
+            field=models.CharField(blank=True, max_length=2, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.0.1 on 2026-10-18 18:50
+
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_activity_geoip'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFingerprints',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('fingerprints', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), size=None)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'user fingerprints',
+                'verbose_name_plural': 'user fingerprints',
+                'db_table': 'users_fingerprints',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.0.1 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_user_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignInFailure',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('failures', models.IntegerField()),
+                ('last_failure', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'sign in failure',
+                'verbose_name_plural': 'sign in failures',
+                'db_table': 'users_sign_in_failures',
+            },
+        ),
+    ]
@@ -1,17 +1,23 @@
 import uuid
 from datetime import datetime, timedelta
 
-import jwt
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.signals import user_logged_in
-from django.db import models
-from django.db.models.signals import post_save
+from django.contrib.postgres.fields import ArrayField
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .managers import CustomUserManager
-from .utils import get_ip_address, get_user_agent
+from .activity import ActivityRecorder
+from .cache import profile_response_cache, token_identifier_cache, token_user_cache, user_fingerprints_cache
+from .geoip import geoip_database
+from .hashing import check_password, make_password
+from .managers import CustomUserManager, SignInFailureManager, ThrottleManager, UserActivityAddressManager, \
+    UserActivityDayManager, UserAgentManager, UserFingerprintsManager
+from .signing import signing_keys
+from .utils import get_ip_address, get_sign_in_fingerprints, get_user_agent
 
 
 class User(AbstractUser):
@@ -28,11 +34,35 @@ class User(AbstractUser):
         verbose_name_plural = 'users'
         ordering = ['-date_joined']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._token_claims = (instance.__dict__.get(
+            'username'), str(instance.__dict__.get('token_identifier')))
+
+        return instance
+
+    def set_password(self, raw_password):
+        self.password = make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        # Only replaces the hash that was just verified, a password changed in the meantime is kept
+        def setter(raw_password):
+            password = make_password(raw_password)
+
+            if User.objects.filter(pk=self.pk, password=self.password).update(password=password):
+                self.password = password
+
+        return check_password(raw_password, self.password, setter)
+
     # https://github.com/GetBlimp/django-rest-framework-jwt/issues/385
-    def generate_token_identifier(self):
+    def generate_token_identifier(self, commit=True):
         new_token_identifier = uuid.uuid4()
         self.token_identifier = new_token_identifier
-        self.save()
+
+        if commit:
+            self.save(update_fields=['token_identifier'])
 
         return self.token_identifier
 
@@ -42,13 +72,13 @@ class User(AbstractUser):
 
     def generate_jwt_token(self):
         # https://tools.ietf.org/html/rfc7519#section-4.1
-        token = jwt.encode({
+        token = signing_keys.encode({
             'iss': settings.SITE_URL,
             'sub': self.username,
             'iat': datetime.utcnow(),
             'exp': datetime.utcnow() + timedelta(minutes=settings.TOKEN_EXPIRE),
             'jti': str(self.token_identifier)
-        }, settings.SECRET_KEY, algorithm='HS256')
+        })
 
         return token.decode('utf-8')
 
@@ -56,6 +86,63 @@ class User(AbstractUser):
         return self.username
 
 
+def delete_profile_response(*usernames):
+    def delete():
+        for username in usernames:
+            profile_response_cache.delete(username)
+
+    delete()
+    transaction.on_commit(delete)
+
+
+# The user fields UserProfileSerializer renders
+PROFILE_USER_FIELDS = frozenset(['id', 'username', 'date_joined'])
+
+
+# Connected before update_token_cache, which replaces the username loaded from the database. Saves of other
+# fields, such as update_last_login on every sign in, keep the cached profile.
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def update_profile_cache(sender, instance, update_fields=None, **kwargs):
+    if not profile_response_cache.enabled:
+        return
+
+    if update_fields is not None and not PROFILE_USER_FIELDS.intersection(update_fields):
+        return
+
+    token_claims = getattr(instance, '_token_claims', None)
+
+    if token_claims is not None and token_claims[0] != instance.username:
+        delete_profile_response(token_claims[0], instance.username)
+    else:
+        delete_profile_response(instance.username)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_token_cache(sender, instance, **kwargs):
+    # Any change to the user (new token identifier, username, deactivation) drops the cached entries, and leaves
+    # a tombstone on commit so a request that read the old row in the meantime cannot put them back
+    token_claims = getattr(instance, '_token_claims', None)
+    instance._token_claims = (instance.username, str(instance.token_identifier))
+
+    if token_claims is not None and token_user_cache.enabled:
+        token_user_cache.delete(*token_claims)
+        transaction.on_commit(lambda: token_user_cache.invalidate(*token_claims))
+
+    if token_identifier_cache.enabled:
+        username = instance.username
+        value = token_identifier_cache.make_value(instance)
+        old_username = token_claims[0] if token_claims is not None else username
+
+        def update_token_identifier():
+            token_identifier_cache.delete(old_username)
+            token_identifier_cache.set(username, value)
+
+        token_identifier_cache.delete(old_username)
+        token_identifier_cache.delete(username)
+        transaction.on_commit(update_token_identifier)
+
+
 class UserPrimaryEmail(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='primary_email')
@@ -74,10 +161,12 @@ class UserPrimaryEmail(models.Model):
         self.verified_at = datetime.now(tz=timezone.utc)
         self.save()
 
-    def set_unverified(self):
+    def set_unverified(self, commit=True):
         self.verified = False
         self.verified_at = None
-        self.save()
+
+        if commit:
+            self.save()
 
     def __str__(self):
         return self.user.username
@@ -112,6 +201,30 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.update_or_create(user=instance)
 
 
+@receiver(post_save, sender=UserProfile)
+def update_user_profile_cache(sender, instance, **kwargs):
+    if profile_response_cache.enabled:
+        delete_profile_response(instance.user.username)
+
+
+# Distinct user agent strings of UserActivity, parsed once when first seen
+class UserAgent(models.Model):
+    value = models.CharField(max_length=255, unique=True)
+    browser = models.CharField(max_length=50)
+    os = models.CharField(max_length=50, verbose_name='OS')
+    device = models.CharField(max_length=50)
+
+    objects = UserAgentManager()
+
+    class Meta:
+        db_table = 'users_agents'
+        verbose_name = 'user agent'
+        verbose_name_plural = 'user agents'
+
+    def __str__(self):
+        return self.value
+
+
 class UserActivity(models.Model):
     id = models.UUIDField(
         primary_key=True, default=uuid.uuid4, editable=False, unique=True)
@@ -124,26 +237,223 @@ class UserActivity(models.Model):
         null=True,
         verbose_name='IP address'
     )
-    user_agent = models.CharField(max_length=255, blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    user_agent = models.ForeignKey(UserAgent, on_delete=models.PROTECT, blank=True, null=True, db_index=False)
+    country = models.CharField(max_length=2, blank=True, null=True)
+    asn = models.PositiveIntegerField(blank=True, null=True, verbose_name='ASN')
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         db_table = 'users_activity'
         verbose_name = 'user activity'
         verbose_name_plural = 'user activities'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'],
+                         name='users_activity_user_created'),
+        ]
 
     def __str__(self):
         return self.user.username
 
 
-def record_user_activity(sender, request, user, **kwargs):
-    ip_address = get_ip_address(request)
-    user_agent = get_user_agent(request)
+# Rollups of UserActivity, kept up to date by write_user_activity so summaries never scan the raw rows
+class UserActivityDay(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE)
+    date = models.DateField()
+    logins = models.PositiveIntegerField(default=0)
+    last_seen = models.DateTimeField()
+
+    objects = UserActivityDayManager()
+
+    class Meta:
+        db_table = 'users_activity_days'
+        verbose_name = 'user activity day'
+        verbose_name_plural = 'user activity days'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='users_activity_days_user_date'),
+        ]
+
+    def __str__(self):
+        return self.user.username
+
+
+class UserActivityAddress(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE)
+    ip_address = models.GenericIPAddressField(
+        unpack_ipv4=True,
+        verbose_name='IP address'
+    )
+    logins = models.PositiveIntegerField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    objects = UserActivityAddressManager()
 
-    new_activity = UserActivity(
-        user=user, ip_address=ip_address, user_agent=user_agent)
-    new_activity.save()
+    class Meta:
+        db_table = 'users_activity_addresses'
+        verbose_name = 'user activity address'
+        verbose_name_plural = 'user activity addresses'
+        ordering = ['-last_seen']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ip_address'], name='users_activity_addresses_user_ip'),
+        ]
+
+    def __str__(self):
+        return self.user.username
+
+
+# Fingerprints of the networks and devices of a user's last USER_FINGERPRINTS_MAX_SIZE distinct sign ins, oldest
+# first. Backs the cache, so new sign ins are detected without reading users_activity.
+class UserFingerprints(models.Model):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
+    fingerprints = ArrayField(models.BigIntegerField())
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = UserFingerprintsManager()
+
+    class Meta:
+        db_table = 'users_fingerprints'
+        verbose_name = 'user fingerprints'
+        verbose_name_plural = 'user fingerprints'
+
+    def __str__(self):
+        return self.user.username
+
+
+class EmailOutbox(models.Model):
+    id = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False, unique=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = ArrayField(models.EmailField(max_length=255))
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'users_email_outbox'
+        verbose_name = 'email outbox'
+        verbose_name_plural = 'email outbox'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['next_attempt_at'],
+                         name='users_email_outbox_next'),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+
+class Throttle(models.Model):
+    key = models.CharField(max_length=255, primary_key=True)
+    tat = models.FloatField()
+
+    objects = ThrottleManager()
+
+    class Meta:
+        db_table = 'users_throttles'
+        verbose_name = 'throttle'
+        verbose_name_plural = 'throttles'
+
+    def __str__(self):
+        return self.key
+
+
+# Failed sign ins of an account or an IP address, see backend/users/lockout.py
+class SignInFailure(models.Model):
+    key = models.CharField(max_length=255, primary_key=True)
+    failures = models.IntegerField()
+    last_failure = models.FloatField()
+
+    objects = SignInFailureManager()
+
+    class Meta:
+        db_table = 'users_sign_in_failures'
+        verbose_name = 'sign in failure'
+        verbose_name_plural = 'sign in failures'
+
+    def __str__(self):
+        return self.key
+
+
+def get_user_activity(row, user_agent_ids):
+    location = geoip_database.lookup(row['ip_address']) or {}
+
+    return UserActivity(user_id=row['user_id'], ip_address=row['ip_address'], created_at=row['created_at'],
+                        user_agent_id=user_agent_ids.get(row['user_agent']), country=location.get('country'),
+                        asn=location.get('asn'))
+
+
+# Adds the fingerprints of each sign in to the user's recent ones and emails the user about sign ins from a new
+# network or device. Users whose fingerprints are cached need no query unless they sign in from somewhere new.
+def update_user_fingerprints(rows):
+    from .email import send_new_sign_in_email
+
+    user_ids = {row['user_id'] for row in rows}
+    fingerprints = user_fingerprints_cache.get_many(user_ids)
+    missing = user_ids - set(fingerprints)
+    loaded = UserFingerprints.objects.get_many(missing) if missing else {}
+    fingerprints.update(loaded)
+    changed = {}
+    new_sign_ins = {}
+
+    for row in sorted(rows, key=lambda row: row['created_at']):
+        recent = fingerprints.get(row['user_id'])
+        new = [fingerprint for fingerprint in get_sign_in_fingerprints(row['ip_address'], row['user_agent'])
+               if recent is None or fingerprint not in recent]
+
+        if not new:
+            continue
+
+        # The first sign in only records where the user signs in from
+        if recent is not None:
+            new_sign_ins[row['user_id']] = row
+
+        recent = [fingerprint for fingerprint in recent or () if fingerprint not in new] + new
+        fingerprints[row['user_id']] = changed[row['user_id']] = recent[-settings.USER_FINGERPRINTS_MAX_SIZE:]
+
+    if changed:
+        UserFingerprints.objects.set_many(changed)
+
+    if loaded or changed:
+        transaction.on_commit(lambda: user_fingerprints_cache.set_many(
+            {user_id: fingerprints[user_id] for user_id in {**loaded, **changed}}))
+
+    if new_sign_ins:
+        for user in User.objects.filter(pk__in=new_sign_ins, is_active=True):
+            send_new_sign_in_email(user, new_sign_ins[user.pk])
+
+
+# Called with batches from the activity buffer, so the GeoIP lookups happen off the sign in path when it is on
+def write_user_activity(rows):
+    user_agent_ids = UserAgent.objects.get_ids(row['user_agent'] for row in rows)
+    activities = [get_user_activity(row, user_agent_ids) for row in rows]
+
+    with transaction.atomic():
+        UserActivity.objects.bulk_create(activities)
+        UserActivityDay.objects.add(rows)
+        UserActivityAddress.objects.add(rows)
+
+        if settings.NEW_SIGN_IN_EMAIL:
+            update_user_fingerprints(rows)
+
+
+activity_recorder = ActivityRecorder(write_user_activity)
+
+
+def record_user_activity(sender, request, user, **kwargs):
+    # created_at is set here as buffered rows can be written a few seconds later
+    activity_recorder.record({
+        'user_id': user.pk,
+        'ip_address': get_ip_address(request),
+        'user_agent': get_user_agent(request),
+        'created_at': timezone.now(),
+    })
 
 
 user_logged_in.connect(record_user_activity)
@@ -1,5 +1,78 @@
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 
 
-class UserActivityPagination(pagination.PageNumberPagination):
+# Pages are fetched by position on the users_activity_user_created index, without a count or an offset. DRF
+# positions a cursor on the first ordering field alone and counts the rows sharing it in an offset, which skips
+# rows on the way back once more rows than a page share a created_at. The position here is the created_at and id
+# of a row instead, which is unique, so the offset is always 0.
+class UserActivityPagination(pagination.CursorPagination):
     page_size = 5
+    ordering = ('-created_at', '-id')
+
+    def _get_position_from_instance(self, instance, ordering):
+        return '%s %s' % (instance.created_at.isoformat(), instance.pk)
+
+    def parse_position(self, position):
+        try:
+            created_at, pk = position.split(' ')
+            created_at = parse_datetime(created_at)
+            pk = uuid.UUID(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return created_at, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (False, None) if self.cursor is None else (self.cursor.reverse, self.cursor.position)
+
+        # Newer rows come first, a reverse cursor walks towards them
+        if reverse:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+
+        if position is not None:
+            created_at, pk = self.parse_position(position)
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{'created_at__' + lookup: created_at}) | Q(created_at=created_at, **{'id__' + lookup: pk}))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = following_position is not None
+            self.next_position = position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = position is not None
+            self.next_position = following_position
+            self.previous_position = position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
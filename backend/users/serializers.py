@@ -1,16 +1,25 @@
-import re
+import copy
+import hashlib
+import json
 
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import caches
+from django.db.models import Q
 from django.utils.encoding import force_text
-from django.utils.http import urlsafe_base64_decode
+from django.utils.http import quote_etag, urlsafe_base64_decode
 from rest_framework import exceptions
 from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
 
-from config.blacklist import USERNAME_BLACKLIST
+from .backends import JWTAuthentication
+from .cache import profile_response_cache
 from .email import send_password_changed_email
-from .models import User, UserActivity
-from .utils import email_token_generator
+from .lockout import SignInLockout
+from .models import User, UserActivity, UserActivityDay
+from .usernames import username_policy
+from .utils import email_token_generator, get_ip_address
 
 
 class SignUpSerializer(serializers.ModelSerializer):
@@ -28,22 +37,7 @@ class SignUpSerializer(serializers.ModelSerializer):
         fields = ('username', 'email', 'password', 'confirm_password', 'token')
 
     def validate_username(self, value):
-        if not re.match('^[a-zA-Z0-9]+$', value):
-            raise serializers.ValidationError('A valid username is required.')
-
-        if value in USERNAME_BLACKLIST:
-            raise serializers.ValidationError(
-                'This username is not acceptable.')
-
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError('This username already exists.')
-
-        return value
-
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError(
-                'This email address already exists.')
+        username_policy.validate(value)
 
         return value
 
@@ -59,12 +53,31 @@ class SignUpSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        return User.objects.create_user(
-            username=validated_data['username'],
+        username = validated_data['username']
+        email = validated_data['email']
+        user = User.objects.create_account(
+            username=username,
             password=validated_data['password'],
-            email=validated_data['email']
+            email=email
         )
 
+        if user is None:
+            conflicts = User.objects.get_conflicts(username, email)
+            errors = {}
+
+            if 'username' in conflicts:
+                username_policy.set_taken(username)
+                errors['username'] = ['This username already exists.']
+
+            if 'email' in conflicts:
+                errors['email'] = ['This email address already exists.']
+
+            # The conflicting user was deleted in the meantime
+            raise serializers.ValidationError(
+                errors or 'Your account could not be created, please try again.')
+
+        return user
+
 
 class SignInSerializer(serializers.Serializer):
     username = serializers.CharField(write_only=True)
@@ -74,13 +87,24 @@ class SignInSerializer(serializers.Serializer):
     def validate(self, attrs):
         username = attrs.get('username', None)
         password = attrs.get('password', None)
+        request = self.context.get('request')
+        ip_address = get_ip_address(request) if request is not None else None
+
+        lockout = SignInLockout(username, ip_address)
+        wait = lockout.get_wait()
+
+        if wait > 0:
+            raise exceptions.Throttled(wait)
 
-        user = authenticate(username=username, password=password)
+        user = authenticate(request, username=username, password=password)
 
         if user is None:
+            lockout.register_failure()
             raise exceptions.AuthenticationFailed(
                 'Username and password is invalid.')
 
+        lockout.reset()
+
         if not user.is_active:
             raise exceptions.AuthenticationFailed(
                 'This account has been disabled.')
@@ -99,6 +123,76 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'location', 'bio', 'date_joined')
 
 
+# The profile as UserProfileView serves it and profile_response_cache stores it
+def render_user_profile(data, user):
+    content = JSONRenderer().render(data)
+
+    return {
+        'content': content,
+        'etag': quote_etag(hashlib.sha1(content).hexdigest()),
+        'last_modified': int(user.profile.updated_at.timestamp()),
+    }
+
+
+class UserProfilesSerializer(serializers.Serializer):
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=150), max_length=settings.USER_PROFILES_MAX, required=False,
+        write_only=True)
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), max_length=settings.USER_PROFILES_MAX, required=False, write_only=True)
+
+    def validate(self, attrs):
+        usernames = {username.lower() for username in attrs.get('usernames', [])}
+        ids = set(attrs.get('ids', []))
+
+        if not usernames and not ids:
+            raise serializers.ValidationError('Please provide usernames or ids.')
+
+        if len(usernames) + len(ids) > settings.USER_PROFILES_MAX:
+            raise serializers.ValidationError(
+                'Please provide at most %d usernames and ids.' % settings.USER_PROFILES_MAX)
+
+        profiles = {}
+
+        if profile_response_cache.enabled:
+            for username, value in profile_response_cache.get_many(usernames).items():
+                data = json.loads(value['content'])
+                profiles[data['username']] = data
+                usernames.discard(username)
+
+        if usernames or ids:
+            users = User.objects.select_related('profile').filter(
+                Q(username__lower__in=usernames) | Q(id__in=ids))
+            values = {}
+
+            for user in users:
+                data = UserProfileSerializer(user).data
+                profiles[user.username] = data
+                values[user.username] = render_user_profile(data, user)
+
+            if profile_response_cache.enabled and values:
+                profile_response_cache.set_many(values)
+
+        attrs['profiles'] = profiles
+
+        return attrs
+
+
+# Verifies the current password at most once, however many of the changes in a request require it
+class ReAuthentication:
+    def __init__(self, user, password):
+        self.user = user
+        self.password = password
+        self.is_authenticated = None
+
+    def verify(self, message):
+        if self.is_authenticated is None:
+            self.is_authenticated = self.user.check_password(self.password)
+
+        if not self.is_authenticated:
+            raise exceptions.NotAuthenticated(message)
+
+
 class UserSerializer(serializers.ModelSerializer):
     username = serializers.CharField(
         min_length=3, max_length=15, required=False)
@@ -119,20 +213,15 @@ class UserSerializer(serializers.ModelSerializer):
                   'password', 'new_password', 'confirm_new_password')
 
     def validate_username(self, value):
-        if not re.match('^[a-zA-Z0-9]+$', value):
-            raise serializers.ValidationError('A valid username is required.')
+        username_policy.validate(value)
 
-        if value in USERNAME_BLACKLIST:
-            raise serializers.ValidationError(
-                'This username is not acceptable.')
-
-        if User.objects.filter(username=value).exists():
+        if username_policy.is_taken(value, self.instance):
             raise serializers.ValidationError('This username already exists.')
 
         return value
 
     def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
+        if User.objects.filter_by_email(value).exclude(pk=self.instance.pk).exists():
             raise serializers.ValidationError(
                 'This email address already exists.')
 
@@ -150,55 +239,64 @@ class UserSerializer(serializers.ModelSerializer):
         return attrs
 
     def update(self, instance, validated_data):
-        username = instance.username
         new_username = validated_data.pop('username', None)
         new_email = validated_data.pop('email', None)
         profile = validated_data.pop('profile', {})
         password = validated_data.pop('password', None)
         new_password = validated_data.pop('new_password', None)
         confirm_new_password = validated_data.pop('confirm_new_password', None)
+        reauthentication = ReAuthentication(instance, password)
+        # The password changed email goes to the account as it was before this update
+        current_user = copy.copy(instance)
+        primary_email_changed = False
+        password_changed = False
+        # Only the changed columns are written, the user can come from the token cache and be a few seconds old
+        update_fields = set(validated_data)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
         if new_username and password is not None:
-            user = authenticate(username=username, password=password)
-
-            if user is None:
-                raise exceptions.NotAuthenticated(
-                    'Your password is incorrect.')
+            reauthentication.verify('Your password is incorrect.')
 
             instance.username = new_username
-            instance.generate_token_identifier()
+            instance.generate_token_identifier(commit=False)
+            update_fields.update(('username', 'token_identifier'))
 
         if new_email and password is not None:
-            user = authenticate(username=username, password=password)
-
-            if user is None:
-                raise exceptions.NotAuthenticated(
-                    'Your password is incorrect.')
+            reauthentication.verify('Your password is incorrect.')
 
             instance.email = new_email
-            instance.primary_email.set_unverified()
+            instance.primary_email.set_unverified(commit=False)
+            primary_email_changed = True
+            update_fields.add('email')
 
         if password and new_password and confirm_new_password is not None:
-            user = authenticate(username=username, password=password)
-
-            if user is None:
-                raise exceptions.NotAuthenticated(
-                    'Your old password is incorrect.')
+            reauthentication.verify('Your old password is incorrect.')
 
             instance.set_password(confirm_new_password)
-            instance.generate_token_identifier()
+            instance.generate_token_identifier(commit=False)
+            password_changed = True
+            update_fields.update(('password', 'token_identifier'))
 
-            send_password_changed_email(user)
+        if update_fields:
+            instance.save(update_fields=update_fields)
 
-        instance.save()
+        if primary_email_changed:
+            instance.primary_email.save()
+
+        profile_changed = False
 
         for attr, value in profile.items():
-            setattr(instance.profile, attr, value)
+            if getattr(instance.profile, attr) != value:
+                setattr(instance.profile, attr, value)
+                profile_changed = True
+
+        if profile_changed:
+            instance.profile.save()
 
-        instance.profile.save()
+        if password_changed:
+            send_password_changed_email(current_user)
 
         return instance
 
@@ -207,7 +305,7 @@ class ResetPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField(max_length=255, write_only=True)
 
     def validate_email(self, value):
-        if not User.objects.filter(email=value).exists():
+        if not User.objects.filter_by_email(value).exists():
             raise exceptions.ParseError(
                 'This email address is not associated with an account.')
 
@@ -246,7 +344,7 @@ class ResetPasswordConfirmSerializer(serializers.Serializer):
                 'This account has been disabled.')
 
         user.set_password(confirm_password)
-        user.generate_token_identifier()
+        user.generate_token_identifier(commit=False)
         user.save()
 
         return attrs
@@ -259,7 +357,7 @@ class VerifyEmailConfirmSerializer(serializers.Serializer):
     def validate(self, attrs):
         try:
             uid = force_text(urlsafe_base64_decode(attrs['uid']))
-            user = User.objects.get(id=uid)
+            user = User.objects.select_related('primary_email').get(id=uid)
         except (TypeError, ValueError, OverflowError, User.DoesNotExist):
             raise exceptions.ParseError(
                 'This uid is not associated with an account.')
@@ -274,7 +372,105 @@ class VerifyEmailConfirmSerializer(serializers.Serializer):
 
 class UserActivitySerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
+    user_agent = serializers.CharField(source='user_agent.value', default=None, read_only=True)
+    browser = serializers.CharField(source='user_agent.browser', default=None, read_only=True)
+    os = serializers.CharField(source='user_agent.os', default=None, read_only=True)
+    device = serializers.CharField(source='user_agent.device', default=None, read_only=True)
 
     class Meta:
         model = UserActivity
-        fields = ('id', 'username', 'ip_address', 'user_agent', 'created_at')
+        fields = ('id', 'username', 'ip_address', 'country', 'asn', 'user_agent', 'browser', 'os', 'device',
+                  'created_at')
+
+
+class UserActivityDaySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserActivityDay
+        fields = ('date', 'logins')
+
+
+class UserActivitySummarySerializer(serializers.Serializer):
+    last_seen = serializers.DateTimeField(allow_null=True)
+    ip_addresses = serializers.IntegerField()
+    days = UserActivityDaySerializer(many=True)
+
+
+class IntrospectTokenSerializer(serializers.Serializer):
+    tokens = serializers.ListField(
+        child=serializers.CharField(max_length=1024), min_length=1, max_length=settings.TOKEN_INTROSPECT_MAX,
+        write_only=True)
+
+    def validate(self, attrs):
+        authentication = JWTAuthentication()
+        payloads = []
+
+        for token in attrs['tokens']:
+            try:
+                payloads.append((authentication.decode_token(token), None))
+            except exceptions.AuthenticationFailed as exc:
+                payloads.append((None, exc.detail))
+
+        # token_identifier is unique, so one IN query resolves every token and the username is compared below
+        token_identifiers = {payload['jti']
+                             for payload, error in payloads if payload is not None}
+        users = User.objects.filter(token_identifier__in=token_identifiers).only(
+            'id', 'username', 'token_identifier', 'is_active')
+        users = {str(user.token_identifier): user for user in users}
+
+        results = []
+
+        for payload, error in payloads:
+            if payload is not None:
+                user = users.get(payload['jti'])
+
+                if user is None or user.username != payload['sub']:
+                    error = 'This token is not associated with an account.'
+                elif not user.is_active:
+                    error = 'This account has been disabled.'
+
+            if error is None:
+                results.append({'active': True, 'claims': payload})
+            else:
+                results.append({'active': False, 'error': error})
+
+        attrs['results'] = results
+
+        return attrs
+
+
+class CheckUsernameSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=15, write_only=True)
+
+    def validate(self, attrs):
+        username = attrs['username']
+        cache = caches[settings.USERNAME_CHECK_CACHE]
+        key = 'users:check-username:%s' % username.lower()
+        result = cache.get(key)
+
+        if result is None:
+            result = {
+                'available': False,
+                'message': None,
+                'usernames': [],
+            }
+
+            try:
+                username_policy.validate(username)
+            except serializers.ValidationError as exc:
+                result['message'] = exc.detail[0]
+            else:
+                result['usernames'] = User.objects.search_usernames(
+                    username, settings.USERNAME_CHECK_MAX)
+
+                if len(username) < 3:
+                    result['message'] = 'A valid username is required.'
+                elif username_policy.is_taken(username):
+                    result['message'] = 'This username already exists.'
+                else:
+                    result['available'] = True
+
+            cache.set(key, result, settings.USERNAME_CHECK_CACHE_TIMEOUT)
+
+        attrs['result'] = dict(username=username, **result)
+
+        return attrs
@@ -0,0 +1,134 @@
+import json
+
+import jwt
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import cached_property
+from jwt.algorithms import Algorithm, HMACAlgorithm, get_default_algorithms
+from jwt.utils import base64url_encode, force_bytes
+
+
+# https://tools.ietf.org/html/rfc8037, PyJWT 1.7 ships without it
+class EdDSAAlgorithm(Algorithm):
+    def prepare_key(self, key):
+        if isinstance(key, (Ed25519PrivateKey, Ed25519PublicKey)):
+            return key
+
+        key = force_bytes(key)
+
+        if b'PRIVATE' in key:
+            key = serialization.load_pem_private_key(
+                key, password=None, backend=default_backend())
+        else:
+            key = serialization.load_pem_public_key(
+                key, backend=default_backend())
+
+        if not isinstance(key, (Ed25519PrivateKey, Ed25519PublicKey)):
+            raise jwt.InvalidKeyError('Expecting an Ed25519 key.')
+
+        return key
+
+    def sign(self, msg, key):
+        return key.sign(msg)
+
+    def verify(self, msg, key, sig):
+        if isinstance(key, Ed25519PrivateKey):
+            key = key.public_key()
+
+        try:
+            key.verify(sig, msg)
+        except InvalidSignature:
+            return False
+
+        return True
+
+    @staticmethod
+    def to_jwk(key_obj):
+        public_bytes = key_obj.public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+        return json.dumps({
+            'kty': 'OKP',
+            'crv': 'Ed25519',
+            'x': base64url_encode(public_bytes).decode('utf-8'),
+        })
+
+
+class SigningKey:
+    def __init__(self, algorithms, kid, algorithm, private_key=None, public_key=None):
+        try:
+            alg_obj = algorithms[algorithm]
+        except KeyError:
+            raise ImproperlyConfigured(
+                'Unsupported JWT signing algorithm: %s' % algorithm)
+
+        self.kid = kid
+        self.algorithm = algorithm
+        self.private_key = None if private_key is None else alg_obj.prepare_key(private_key)
+        self.jwk = None
+
+        if public_key is not None:
+            self.public_key = alg_obj.prepare_key(public_key)
+        elif isinstance(alg_obj, HMACAlgorithm):
+            self.public_key = self.private_key
+        else:
+            self.public_key = self.private_key.public_key()
+
+        if not isinstance(alg_obj, HMACAlgorithm):
+            self.jwk = json.loads(alg_obj.to_jwk(self.public_key))
+            self.jwk.update({'kid': kid, 'alg': algorithm, 'use': 'sig'})
+
+
+# Keys are parsed once per process. The first key with a private key signs new tokens, a token is verified with
+# the key named by its `kid` header, or with the first key when it has none.
+class SigningKeyRegistry:
+    def __init__(self):
+        self.algorithms = get_default_algorithms()
+        self.algorithms['EdDSA'] = EdDSAAlgorithm()
+        self.jws = jwt.PyJWT()
+        self.jws.register_algorithm('EdDSA', self.algorithms['EdDSA'])
+
+    @cached_property
+    def keys(self):
+        keys = settings.JWT_SIGNING_KEYS or [
+            {'kid': None, 'algorithm': 'HS256', 'private_key': settings.SECRET_KEY},
+        ]
+
+        return [SigningKey(self.algorithms, **key) for key in keys]
+
+    @cached_property
+    def keys_by_kid(self):
+        return {key.kid: key for key in self.keys}
+
+    @cached_property
+    def signing_key(self):
+        for key in self.keys:
+            if key.private_key is not None:
+                return key
+
+        raise jwt.InvalidKeyError('No signing key is configured.')
+
+    def encode(self, payload):
+        key = self.signing_key
+        headers = None if key.kid is None else {'kid': key.kid}
+
+        return self.jws.encode(payload, key.private_key, algorithm=key.algorithm, headers=headers)
+
+    def decode(self, token):
+        kid = self.jws.get_unverified_header(token).get('kid')
+        key = self.keys_by_kid.get(kid, self.keys[0] if kid is None else None)
+
+        if key is None:
+            raise jwt.InvalidTokenError('Unknown signing key.')
+
+        return self.jws.decode(token, key.public_key, algorithms=[key.algorithm])
+
+    def get_public_keys(self):
+        return [key.jwk for key in self.keys if key.jwk is not None]
+
+
+signing_keys = SigningKeyRegistry()
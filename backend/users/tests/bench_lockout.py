@@ -0,0 +1,47 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import hashers
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from backend.users.models import SignInFailure, User
+from backend.users.views import SignInView
+
+ACCOUNTS = 20
+ATTEMPTS = 25
+
+
+# Credential stuffing against ACCOUNTS accounts from one IP address, with and without the lockout. Reports the
+# password hashes computed and the sign ins per second. Run with python manage.py test --pattern="bench_*.py"
+@mock.patch.object(SignInView, 'throttle_classes', ())
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.Argon2PasswordHasher'])
+class SignInLockoutBenchmark(TestCase):
+    def setUp(self):
+        for i in range(ACCOUNTS):
+            User.objects.create_user(username='user%d' % i, email='user%d@example.com' % i, password='password123')
+
+    def measure(self):
+        SignInFailure.objects.all().delete()
+        client = APIClient()
+
+        with mock.patch.object(hashers, 'check_password', wraps=hashers.check_password) as check_password:
+            start = time.perf_counter()
+
+            for attempt in range(ATTEMPTS):
+                for i in range(ACCOUNTS):
+                    client.post('/v1/users/signin/', {'username': 'user%d' % i, 'password': 'guess%d' % attempt},
+                                format='json')
+
+            elapsed = time.perf_counter() - start
+
+        return check_password.call_count, ACCOUNTS * ATTEMPTS / elapsed
+
+    def test_credential_stuffing(self):
+        with override_settings(SIGN_IN_LOCKOUT_USER_THRESHOLD=10 ** 6, SIGN_IN_LOCKOUT_IP_THRESHOLD=10 ** 6):
+            before = self.measure()
+
+        after = self.measure()
+
+        print('\nsign in without lockout: %d hashes, %.0f sign ins/sec' % before)
+        print('sign in with lockout: %d hashes, %.0f sign ins/sec' % after)
@@ -0,0 +1,36 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import AnonRateThrottle
+
+from config.throttle import AnonGCRAThrottle
+
+CHECKS = 5000
+
+
+# Throttle checks per second of DRF's timestamp list and the Postgres GCRA row, all allowed.
+# Run with python manage.py test --pattern="bench_*.py"
+class ThrottleBenchmark(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = APIRequestFactory().post('/', REMOTE_ADDR='192.0.2.1')
+        self.request.user = AnonymousUser()
+
+    def measure(self, throttle_class):
+        throttle = type(throttle_class.__name__, (throttle_class,), {'scope': 'bench', 'rate': '%d/hour' % CHECKS})()
+
+        start = time.perf_counter()
+
+        for _ in range(CHECKS):
+            self.assertTrue(throttle.allow_request(self.request, None))
+
+        return CHECKS / (time.perf_counter() - start)
+
+    def test_throttles(self):
+        for throttle_class in (AnonRateThrottle, AnonGCRAThrottle):
+            print('\n%s: %.0f checks/sec' % (throttle_class.__name__, self.measure(throttle_class)), end='')
+
+        print()
@@ -0,0 +1,42 @@
+import re
+import timeit
+
+from django.test import TestCase, override_settings
+
+from backend.users.models import User
+from backend.users.usernames import username_policy
+from config.blacklist import USERNAME_BLACKLIST
+
+CHECKS = 100000
+
+
+def check_username(value):
+    # The checks before the shared policy
+    return re.match('^[a-zA-Z0-9]+$', value) is not None and value not in USERNAME_BLACKLIST
+
+
+# Username checks per second with the blacklist list scan and the compiled policy, then availability checks of a
+# taken username with and without USERNAME_TAKEN_CACHE. Run with python manage.py test --pattern="bench_*.py"
+class UsernamePolicyBenchmark(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+
+    def test_is_reserved(self):
+        before = CHECKS / timeit.timeit(lambda: check_username('someone'), number=CHECKS)
+        after = CHECKS / timeit.timeit(
+            lambda: username_policy.is_valid('someone') and not username_policy.is_reserved('someone'),
+            number=CHECKS)
+
+        print('\nusername checks: %.0f/sec with the list, %.0f/sec with the policy' % (before, after))
+
+    def test_is_taken(self):
+        checks = CHECKS // 100
+
+        with override_settings(USERNAME_TAKEN_CACHE=False):
+            before = checks / timeit.timeit(lambda: username_policy.is_taken('alice'), number=checks)
+
+        with override_settings(USERNAME_TAKEN_CACHE=True):
+            username_policy.taken.clear()
+            after = checks / timeit.timeit(lambda: username_policy.is_taken('alice'), number=checks)
+
+        print('\ntaken username checks: %.0f/sec without the cache, %.0f/sec with it' % (before, after))
@@ -0,0 +1,43 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from backend.users.cache import token_user_cache
+from backend.users.models import User
+from backend.users.views import VerifyTokenView
+
+REQUESTS = 2000
+
+
+# Requests per second of /v1/users/verify-token/ with and without the token cache. Throttles are left out so
+# only authentication is measured. Run with python manage.py test --pattern="bench_*.py"
+@mock.patch.object(VerifyTokenView, 'throttle_classes', ())
+class VerifyTokenBenchmark(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_user_cache.local.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.user.token)
+
+    def measure(self):
+        self.assertEqual(self.client.post('/v1/users/verify-token/').status_code, 200)
+
+        start = time.perf_counter()
+
+        for _ in range(REQUESTS):
+            self.client.post('/v1/users/verify-token/')
+
+        return REQUESTS / (time.perf_counter() - start)
+
+    def test_verify_token(self):
+        with override_settings(TOKEN_CACHE=False):
+            before = self.measure()
+
+        with override_settings(TOKEN_CACHE=True):
+            after = self.measure()
+
+        print('\nverify-token: %.0f requests/sec without the token cache, %.0f with it' % (before, after))
@@ -0,0 +1,64 @@
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from backend.users.activity import ActivityRecorder
+
+
+@override_settings(USER_ACTIVITY_BUFFER=True, USER_ACTIVITY_BUFFER_SIZE=3, USER_ACTIVITY_BUFFER_MAX_SIZE=5,
+                   USER_ACTIVITY_BUFFER_POLICY='drop', USER_ACTIVITY_BUFFER_INTERVAL=60)
+class ActivityRecorderTests(SimpleTestCase):
+    def setUp(self):
+        self.batches = []
+        self.written = threading.Event()
+        self.recorder = ActivityRecorder(self.write)
+
+    def write(self, rows):
+        self.batches.append(rows)
+        self.written.set()
+
+    def record(self, *rows):
+        for row in rows:
+            self.recorder.record(row)
+
+    @override_settings(USER_ACTIVITY_BUFFER=False)
+    def test_unbuffered_rows_are_written_right_away(self):
+        self.record(1, 2)
+
+        self.assertEqual(self.batches, [[1], [2]])
+
+    def test_rows_are_queued_until_flushed(self):
+        self.record(1, 2)
+        self.assertEqual(self.batches, [])
+
+        self.recorder.flush()
+        self.recorder.flush()
+
+        self.assertEqual(self.batches, [[1, 2]])
+
+    def test_full_batch_wakes_the_writer(self):
+        self.record(1, 2, 3)
+
+        self.assertTrue(self.written.wait(5))
+        self.assertEqual(self.batches, [[1, 2, 3]])
+
+    # The writer is not woken before the buffer is full, as if it had fallen behind
+    @override_settings(USER_ACTIVITY_BUFFER_SIZE=10)
+    def test_full_buffer_drops_new_rows(self):
+        self.record(1, 2, 3, 4, 5, 'dropped', 'dropped')
+
+        self.assertEqual(self.recorder.dropped, 2)
+        self.assertEqual(self.batches, [])
+
+        self.recorder.flush()
+        self.assertEqual(self.batches, [[1, 2, 3, 4, 5]])
+
+    @override_settings(USER_ACTIVITY_BUFFER_SIZE=10, USER_ACTIVITY_BUFFER_POLICY='flush')
+    def test_full_buffer_is_written_by_the_request(self):
+        self.record(1, 2, 3, 4, 5, 6)
+
+        self.assertEqual(self.recorder.dropped, 0)
+        self.assertEqual(self.batches, [[1, 2, 3, 4, 5]])
+
+        self.recorder.flush()
+        self.assertEqual(self.batches, [[1, 2, 3, 4, 5], [6]])
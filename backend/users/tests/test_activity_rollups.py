@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.users.models import User, UserActivityAddress, UserActivityDay, write_user_activity
+
+
+class UserActivityRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.now = timezone.now()
+        self.old = self.now - timedelta(days=settings.USER_ACTIVITY_SUMMARY_DAYS + 10)
+
+        # Two batches, the second adds to the rows of the first
+        write_user_activity([
+            self.get_row('192.0.2.1', self.now - timedelta(days=2)),
+            self.get_row('192.0.2.1', self.now - timedelta(days=2, minutes=1)),
+            self.get_row('192.0.2.2', self.old),
+        ])
+        write_user_activity([
+            self.get_row('192.0.2.1', self.now),
+            self.get_row('192.0.2.1', self.now - timedelta(minutes=1)),
+            self.get_row(None, self.now - timedelta(minutes=2)),
+        ])
+
+    def get_row(self, ip_address, created_at):
+        return {
+            'user_id': self.user.pk,
+            'ip_address': ip_address,
+            'user_agent': 'Mozilla/5.0',
+            'created_at': created_at,
+        }
+
+    def test_days(self):
+        days = {day.date: (day.logins, day.last_seen) for day in UserActivityDay.objects.filter(user=self.user)}
+
+        self.assertEqual(days, {
+            timezone.localdate(self.now): (3, self.now),
+            timezone.localdate(self.now - timedelta(days=2)): (2, self.now - timedelta(days=2)),
+            timezone.localdate(self.old): (1, self.old),
+        })
+
+    def test_addresses(self):
+        addresses = {address.ip_address: (address.logins, address.first_seen, address.last_seen)
+                     for address in UserActivityAddress.objects.filter(user=self.user)}
+
+        self.assertEqual(addresses, {
+            '192.0.2.1': (4, self.now - timedelta(days=2, minutes=1), self.now),
+            '192.0.2.2': (1, self.old, self.old),
+        })
+
+    def test_summary(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.user.token)
+
+        response = client.get('/v1/users/me/activity/summary/')
+
+        self.assertEqual(response.status_code, 200)
+        # Addresses and days older than USER_ACTIVITY_SUMMARY_DAYS are left out
+        self.assertEqual(response.json(), {
+            'last_seen': self.now.isoformat().replace('+00:00', 'Z'),
+            'ip_addresses': 1,
+            'days': [
+                {'date': str(timezone.localdate(self.now)), 'logins': 3},
+                {'date': str(timezone.localdate(self.now - timedelta(days=2))), 'logins': 2},
+            ],
+        })
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework import exceptions
+
+from backend.users.backends import JWTAuthentication
+from backend.users.cache import token_user_cache
+from backend.users.models import User
+from backend.users.serializers import UserSerializer
+from backend.users.signing import signing_keys
+
+
+@override_settings(TOKEN_CACHE=True)
+class JWTAuthenticationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_user_cache.local.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.authentication = JWTAuthentication()
+
+    def get_user(self):
+        return self.authentication.get_user(signing_keys.decode(self.user.token))
+
+    def test_warm_lookup_runs_no_queries(self):
+        self.get_user()
+
+        with self.assertNumQueries(0):
+            user = self.get_user()
+
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_password_is_not_cached(self):
+        self.get_user()
+        values = token_user_cache.get(self.user.username, str(self.user.token_identifier))
+
+        self.assertNotIn('password', values)
+        self.assertNotIn(self.user.password, values.values())
+
+    def test_stale_user_does_not_overwrite_other_changes(self):
+        self.get_user()
+        # Another worker keeps serving its local copy after the email change below
+        stale_user = self.get_user()
+        User.objects.filter(pk=self.user.pk).update(email='new@example.com')
+
+        serializer = UserSerializer(stale_user, data={'bio': 'Hello'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'new@example.com')
+        self.assertEqual(self.user.profile.bio, 'Hello')
+
+    def test_stale_user_signs_out_without_overwriting_other_changes(self):
+        stale_user = self.get_user()
+        User.objects.filter(pk=self.user.pk).update(email='new@example.com')
+
+        stale_user.generate_token_identifier()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'new@example.com')
+        self.assertEqual(self.user.token_identifier, stale_user.token_identifier)
+
+
+# Saves run their on commit callbacks, unlike in TestCase
+@override_settings(TOKEN_CACHE=True)
+class JWTAuthenticationCacheInvalidationTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        token_user_cache.local.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.authentication = JWTAuthentication()
+        self.payload = signing_keys.decode(self.user.token)
+
+    def test_lookup_racing_sign_out_does_not_cache_revoked_token(self):
+        get = User.objects.get
+
+        # The user signs out between the lookup reading the row and caching it
+        def get_then_sign_out(**kwargs):
+            user = get(**kwargs)
+            User.objects.filter(pk=user.pk).first().generate_token_identifier()
+
+            return user
+
+        with mock.patch.object(User.objects, 'get', side_effect=get_then_sign_out):
+            self.authentication.get_user(self.payload)
+
+        self.assertIsNone(token_user_cache.get(self.payload['sub'], self.payload['jti']))
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.get_user(self.payload)
+
+    def test_user_is_cached_again_after_tombstone_expires(self):
+        self.authentication.get_user(self.payload)
+        self.user.save(update_fields=['email'])
+
+        with self.assertNumQueries(1):
+            self.authentication.get_user(self.payload)
+
+        with override_settings(TOKEN_CACHE_TOMBSTONE_TIMEOUT=0):
+            self.user.save(update_fields=['email'])
+
+        self.authentication.get_user(self.payload)
+
+        with self.assertNumQueries(0):
+            self.authentication.get_user(self.payload)
@@ -0,0 +1,33 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+
+class BuildGeoIPTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.output = os.path.join(self.directory, 'geoip.db')
+
+    def build_geoip(self, *rows):
+        path = os.path.join(self.directory, 'ranges.csv')
+
+        with open(path, 'w') as f:
+            f.write('network,country,asn\n' + ''.join(row + '\n' for row in rows))
+
+        call_command('build_geoip', path, output=self.output, stdout=StringIO())
+
+    def test_builds_database(self):
+        self.build_geoip('192.0.2.0/24,US,64496', '2001:db8::/32,DE,64497')
+
+        self.assertTrue(os.path.exists(self.output))
+
+    def test_asn_out_of_range(self):
+        with self.assertRaisesMessage(CommandError, 'Invalid range on line 3:'):
+            self.build_geoip('192.0.2.0/24,US,64496', '198.51.100.0/24,US,4294967296')
+
+        self.assertEqual(os.listdir(self.directory), ['ranges.csv'])
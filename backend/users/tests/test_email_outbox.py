@@ -0,0 +1,78 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from backend.users.email import send_email
+from backend.users.models import EmailOutbox
+
+
+class SendQueuedEmailTests(TestCase):
+    def send_queued_email(self):
+        out = StringIO()
+        call_command('send_queued_email', once=True, stdout=out)
+
+        return out.getvalue()
+
+    def test_claims_and_sends_due_emails(self):
+        send_email('Hello', 'Body', ['alice@example.com'])
+        send_email('Hello', 'Body', ['bob@example.com'])
+        EmailOutbox.objects.create(subject='Later', body='Body', from_email=settings.EMAIL_FROM,
+                                   to=['carol@example.com'], next_attempt_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(self.send_queued_email(), 'Sent 2 emails, 0 failed.\n')
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['alice@example.com', 'bob@example.com'])
+        self.assertEqual(list(EmailOutbox.objects.values_list('subject', flat=True)), ['Later'])
+
+    def test_failed_send_is_retried_with_backoff(self):
+        send_email('Hello', 'Body', ['alice@example.com'])
+
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=SMTPException('Unavailable')):
+            start = timezone.now()
+            self.assertEqual(self.send_queued_email(), 'Sent 0 emails, 1 failed.\n')
+
+            email = EmailOutbox.objects.get()
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, 'Unavailable')
+            self.assertGreaterEqual(email.next_attempt_at, start + timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY))
+
+            # Not due yet
+            self.assertEqual(self.send_queued_email(), '')
+
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            start = timezone.now()
+            self.send_queued_email()
+
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.attempts, 2)
+        self.assertGreaterEqual(email.next_attempt_at, start + timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2))
+        self.assertEqual(mail.outbox, [])
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(self.send_queued_email(), 'Sent 1 emails, 0 failed.\n')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    def test_email_past_max_attempts_is_not_sent(self):
+        send_email('Hello', 'Body', ['alice@example.com'])
+        EmailOutbox.objects.update(attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS)
+
+        self.assertEqual(self.send_queued_email(), '')
+        self.assertEqual(mail.outbox, [])
+        self.assertTrue(EmailOutbox.objects.exists())
+
+    def test_email_of_rolled_back_request_is_not_sent(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            send_email('Hello', 'Body', ['alice@example.com'])
+            raise ValueError
+
+        self.assertEqual(self.send_queued_email(), '')
+        self.assertEqual(mail.outbox, [])
@@ -0,0 +1,104 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from backend.users.models import User
+
+ROWS = [
+    {'username': 'alice', 'email': 'alice@example.com', 'password': 'password123', 'location': 'Earth', 'bio': 'Hi'},
+    {'username': 'bob', 'email': 'bob@example.com', 'password': 'password123', 'location': '', 'bio': ''},
+    # Invalid rows
+    {'username': 'a' * 16, 'email': 'long@example.com', 'password': 'password123', 'location': '', 'bio': ''},
+    {'username': 'carol!', 'email': 'carol@example.com', 'password': 'password123', 'location': '', 'bio': ''},
+    {'username': 'admin', 'email': 'admin@example.com', 'password': 'password123', 'location': '', 'bio': ''},
+    {'username': 'dave', 'email': 'not an email', 'password': 'password123', 'location': '', 'bio': ''},
+    {'username': 'erin', 'email': 'erin@example.com', 'password': '', 'location': '', 'bio': ''},
+    {'username': 'frank', 'email': 'frank@example.com', 'password': 'password123', 'location': 'x' * 256, 'bio': ''},
+    # Conflicts with an existing user, in another case
+    {'username': 'ZOE', 'email': 'zoe2@example.com', 'password': 'password123', 'location': '', 'bio': ''},
+    {'username': 'zoe2', 'email': 'ZOE@example.com', 'password': 'password123', 'location': '', 'bio': ''},
+    # Conflicts with a row of the same file
+    {'username': 'Alice', 'email': 'alice2@example.com', 'password': 'password123', 'location': '', 'bio': ''},
+]
+
+
+class ImportUsersTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='zoe', email='zoe@example.com', password='password123')
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_csv(self, rows):
+        path = os.path.join(self.directory, 'users.csv')
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(ROWS[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+        return path
+
+    def write_ndjson(self, rows):
+        path = os.path.join(self.directory, 'users.ndjson')
+
+        with open(path, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+
+        return path
+
+    def import_users(self, path, *args):
+        out = StringIO()
+        call_command('import_users', path, '--workers=0', '--chunk-size=4', *args, stdout=out)
+
+        return out.getvalue()
+
+    def assertImported(self, out):
+        self.assertIn('Imported 2 users, 9 rows were invalid or already exist.', out)
+        self.assertEqual(sorted(User.objects.values_list('username', flat=True)), ['alice', 'bob', 'zoe'])
+
+        alice = User.objects.get(username='alice')
+        self.assertEqual(alice.email, 'alice@example.com')
+        self.assertEqual(alice.profile.location, 'Earth')
+        self.assertEqual(alice.profile.bio, 'Hi')
+        self.assertFalse(alice.primary_email.verified)
+        self.assertTrue(alice.check_password('password123'))
+
+    def test_csv(self):
+        self.assertImported(self.import_users(self.write_csv(ROWS)))
+
+    def test_ndjson(self):
+        self.assertImported(self.import_users(self.write_ndjson(ROWS)))
+
+    def test_hashed_passwords(self):
+        rows = [dict(row, password=make_password(row['password']) if row['password'] else '') for row in ROWS]
+
+        self.assertImported(self.import_users(self.write_csv(rows), '--hashed'))
+
+    def test_unhashed_password_with_hashed(self):
+        with self.assertRaisesMessage(CommandError, 'A password is not hashed by any of the PASSWORD_HASHERS.'):
+            self.import_users(self.write_csv(ROWS), '--hashed')
+
+        self.assertFalse(User.objects.filter(username='alice').exists())
+
+    def test_resumes_after_checkpoint(self):
+        path = self.write_csv(ROWS)
+
+        with open(path + '.checkpoint', 'w') as f:
+            json.dump({'rows': 1}, f)
+
+        out = self.import_users(path)
+
+        self.assertIn('Resuming after row 1.', out)
+        # The first row was skipped, so the later Alice row is imported
+        self.assertIn('Imported 2 users, 8 rows were invalid or already exist.', out)
+        self.assertEqual(sorted(User.objects.values_list('username', flat=True)), ['Alice', 'bob', 'zoe'])
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import hashers
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from backend.users.lockout import SignInLockout
+from backend.users.models import SignInFailure, User
+from backend.users.views import SignInView
+
+
+def register_failure(_):
+    try:
+        SignInLockout('alice', '192.0.2.1').register_failure()
+    finally:
+        connection.close()
+
+
+class SignInLockoutConcurrencyTests(TransactionTestCase):
+    def test_concurrent_failures_are_all_counted(self):
+        with ThreadPoolExecutor(10) as executor:
+            list(executor.map(register_failure, range(10)))
+
+        self.assertEqual(sorted(SignInFailure.objects.values_list('failures', flat=True)), [10, 10])
+
+
+@mock.patch.object(SignInView, 'throttle_classes', ())
+class SignInLockoutTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.client = APIClient()
+
+    def sign_in(self, username, password):
+        return self.client.post('/v1/users/signin/', {'username': username, 'password': password}, format='json')
+
+    def test_locked_out_sign_ins_skip_hashing(self):
+        with mock.patch.object(hashers, 'check_password', wraps=hashers.check_password) as check_password:
+            statuses = [self.sign_in('alice', 'wrong').status_code for _ in range(10)]
+
+        self.assertEqual(statuses, [403] * 5 + [429] * 5)
+        self.assertEqual(check_password.call_count, 5)
+
+    def test_unknown_username_is_hashed_once(self):
+        with mock.patch.object(hashers, 'check_password', wraps=hashers.check_password) as check_password:
+            self.assertEqual(self.sign_in('bob', 'password123').status_code, 403)
+
+        self.assertEqual(check_password.call_count, 1)
+
+    def test_success_resets_the_account(self):
+        for _ in range(4):
+            self.sign_in('alice', 'wrong')
+
+        self.assertEqual(self.sign_in('alice', 'password123').status_code, 200)
+        self.assertEqual(self.sign_in('alice', 'wrong').status_code, 403)
+        # The IP address keeps its failures
+        self.assertEqual(sorted(SignInFailure.objects.values_list('failures', flat=True)), [1, 5])
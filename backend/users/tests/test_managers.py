@@ -0,0 +1,46 @@
+from django.db import connection
+from django.test import TestCase
+
+from backend.users.models import User
+
+
+class CaseInsensitiveLookupTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='Alice', email='Alice@example.com', password='password123')
+
+        # The table is too small for the planner to prefer an index on its own, rolled back with the test
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_username_lookup_uses_index(self):
+        plan = User.objects.filter(username__lower='alice').explain()
+
+        self.assertIn('using users_username_lower on users', plan)
+        self.assertEqual(User.objects.get_by_natural_key('ALICE').username, 'Alice')
+
+    def test_email_lookup_uses_index(self):
+        plan = User.objects.filter_by_email('ALICE@example.com').explain()
+
+        self.assertIn('using users_email_lower on users', plan)
+        self.assertTrue(User.objects.filter_by_email('alice@EXAMPLE.com').exists())
+
+
+class SearchUsernamesTests(TestCase):
+    def setUp(self):
+        for i, username in enumerate(('Alice', 'alicia', 'al_ice', 'al%ice', 'al\\ice', 'alx', 'bob')):
+            User.objects.create_user(username=username, email='user%d@example.com' % i, password='password')
+
+        User.objects.create_user(username='alina', email='alina@example.com', password='password', is_active=False)
+
+    def test_prefix_regardless_of_case(self):
+        self.assertEqual(User.objects.search_usernames('AL', 10),
+                         ['al%ice', 'al\\ice', 'al_ice', 'Alice', 'alicia', 'alx'])
+        self.assertEqual(User.objects.search_usernames('ali', 10), ['Alice', 'alicia'])
+
+    def test_limit(self):
+        self.assertEqual(User.objects.search_usernames('ali', 1), ['Alice'])
+
+    def test_wildcards_are_escaped(self):
+        self.assertEqual(User.objects.search_usernames('al_', 10), ['al_ice'])
+        self.assertEqual(User.objects.search_usernames('al%', 10), ['al%ice'])
+        self.assertEqual(User.objects.search_usernames('al\\', 10), ['al\\ice'])
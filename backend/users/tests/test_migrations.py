@@ -0,0 +1,15 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class MigrationTests(TestCase):
+    # Every model change ships with its migration
+    def test_no_missing_migrations(self):
+        out = StringIO()
+
+        try:
+            call_command('makemigrations', 'users', check=True, dry_run=True, stdout=out)
+        except SystemExit:
+            self.fail('Missing migrations:\n%s' % out.getvalue())
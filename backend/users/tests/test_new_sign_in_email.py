@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from backend.users.models import EmailOutbox, User, write_user_activity
+
+FIREFOX = 'Mozilla/5.0 (X11; Linux x86_64; rv:70.0) Gecko/20100101 Firefox/70.0'
+IPHONE = 'Mozilla/5.0 (iPhone; CPU iPhone OS 13_2 like Mac OS X) AppleWebKit/605.1.15 Version/13.0 Safari/604.1'
+
+
+@override_settings(NEW_SIGN_IN_EMAIL=True, EMAIL_OUTBOX=True)
+class NewSignInEmailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+
+        # The first sign in only records where the user signs in from
+        self.sign_in('192.0.2.1', FIREFOX)
+
+    # Returns the number of new sign in emails so far
+    def sign_in(self, ip_address, user_agent):
+        write_user_activity([{
+            'user_id': self.user.pk,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'created_at': timezone.now(),
+        }])
+
+        return EmailOutbox.objects.count()
+
+    def test_known_network_and_device(self):
+        self.assertEqual(self.sign_in('192.0.2.1', FIREFOX), 0)
+        # Same /24 network
+        self.assertEqual(self.sign_in('192.0.2.200', FIREFOX), 0)
+
+    def test_new_network(self):
+        self.assertEqual(self.sign_in('198.51.100.1', FIREFOX), 1)
+        self.assertEqual(self.sign_in('198.51.100.1', FIREFOX), 1)
+
+    def test_new_device(self):
+        self.assertEqual(self.sign_in('192.0.2.1', IPHONE), 1)
+        self.assertEqual(self.sign_in('192.0.2.1', IPHONE), 1)
+
+    def test_one_email_per_batch(self):
+        write_user_activity([{
+            'user_id': self.user.pk,
+            'ip_address': ip_address,
+            'user_agent': IPHONE,
+            'created_at': timezone.now(),
+        } for ip_address in ('198.51.100.1', '203.0.113.1')])
+
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_inactive_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.assertEqual(self.sign_in('198.51.100.1', IPHONE), 0)
+
+    @override_settings(NEW_SIGN_IN_EMAIL=False)
+    def test_disabled(self):
+        self.assertEqual(self.sign_in('198.51.100.1', IPHONE), 0)
@@ -0,0 +1,60 @@
+import base64
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.users.models import User, UserActivity, write_user_activity
+
+
+class UserActivityPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        bob = User.objects.create_user(username='bob', email='bob@example.com', password='password123')
+        now = timezone.now()
+
+        # More rows share a created_at than fit on a page
+        write_user_activity([{
+            'user_id': user.pk,
+            'ip_address': '192.0.2.%d' % i,
+            'user_agent': 'Mozilla/5.0',
+            'created_at': created_at,
+        } for i, (user, created_at) in enumerate(
+            [(self.user, now)] * 7 + [(self.user, now - timedelta(days=1))] * 4 + [(bob, now)] * 3)])
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.user.token)
+
+    # Follows the `link` of every page, returns the ids of each page and the last response
+    def get_pages(self, url, link):
+        pages = []
+
+        while url:
+            data = self.client.get(url).json()
+            pages.append([activity['id'] for activity in data['results']])
+            last, url = data, data[link]
+
+        return pages, last
+
+    def test_pages_cover_every_row_once_across_ties(self):
+        expected = [str(pk) for pk in UserActivity.objects.filter(user=self.user).order_by(
+            '-created_at', '-id').values_list('id', flat=True)]
+
+        pages, last = self.get_pages('/v1/users/me/activity/', 'next')
+
+        self.assertEqual([len(page) for page in pages], [5, 5, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_previous_pages_match_next_pages(self):
+        pages, last = self.get_pages('/v1/users/me/activity/', 'next')
+        previous_pages, first = self.get_pages(last['previous'], 'previous')
+
+        self.assertEqual(previous_pages, pages[-2::-1])
+
+    def test_invalid_position(self):
+        cursor = base64.b64encode(b'p=2020-01-01').decode('ascii')
+
+        self.assertEqual(self.client.get('/v1/users/me/activity/?cursor=' + cursor).status_code, 404)
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from backend.users.management.commands.partition_user_activity import get_month
+from backend.users.models import User, UserActivity, write_user_activity
+
+
+class PartitionUserActivityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.now = datetime.now(tz=timezone.utc)
+
+    def partition(self, offset):
+        return 'users_activity_%s' % get_month(self.now, offset).strftime('%Y_%m')
+
+    def count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM %s' % table)
+
+            return cursor.fetchone()[0]
+
+    def partition_user_activity(self):
+        out = StringIO()
+        call_command('partition_user_activity', months_ahead=3, retention=0, stdout=out)
+
+        return out.getvalue()
+
+    def test_creates_new_months(self):
+        out = self.partition_user_activity()
+
+        self.assertIn('Created partition %s.' % self.partition(3), out)
+        self.assertEqual(self.count(self.partition(3)), 0)
+        self.assertEqual(self.partition_user_activity(), '')
+
+    def test_moves_rows_out_of_the_default_partition(self):
+        write_user_activity([{
+            'user_id': self.user.pk,
+            'ip_address': '192.0.2.1',
+            'user_agent': 'Mozilla/5.0',
+            'created_at': get_month(self.now, 3),
+        }])
+        self.assertEqual(self.count('users_activity_default'), 1)
+
+        self.assertIn('Created partition %s.' % self.partition(3), self.partition_user_activity())
+        self.assertEqual(self.count('users_activity_default'), 0)
+        self.assertEqual(self.count(self.partition(3)), 1)
+        self.assertEqual(UserActivity.objects.filter(user=self.user).count(), 1)
@@ -0,0 +1,68 @@
+import hashlib
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from backend.users.cache import profile_response_cache
+from backend.users.models import User
+
+
+@override_settings(PROFILE_CACHE=True)
+class UserProfileCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.client = APIClient()
+
+    def get_profile(self, username='alice', **extra):
+        return self.client.get('/v1/users/%s/' % username, **extra)
+
+    def test_headers(self):
+        response = self.get_profile()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"%s"' % hashlib.sha1(response.content).hexdigest())
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            cached_response = self.get_profile()
+
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response['ETag'], response['ETag'])
+        self.assertEqual(cached_response['Last-Modified'], response['Last-Modified'])
+
+    def test_not_modified(self):
+        response = self.get_profile()
+
+        self.assertEqual(self.get_profile(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.get_profile(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+        self.assertEqual(self.get_profile(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_profile_save_invalidates(self):
+        etag = self.get_profile()['ETag']
+
+        self.user.profile.bio = 'Hello'
+        self.user.profile.save()
+
+        response = self.get_profile(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bio'], 'Hello')
+
+    def test_username_change_invalidates(self):
+        self.get_profile()
+
+        self.user.username = 'alice2'
+        self.user.save(update_fields=['username'])
+
+        self.assertEqual(self.get_profile().status_code, 404)
+        self.assertEqual(self.get_profile('alice2').json()['username'], 'alice2')
+
+    def test_sign_in_keeps_cached_profile(self):
+        self.get_profile()
+
+        response = self.client.post('/v1/users/signin/', {'username': 'alice', 'password': 'password123'},
+                                    format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(profile_response_cache.get('alice'))
@@ -0,0 +1,163 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from backend.users.cache import token_user_cache
+from backend.users.models import User, UserAgent, write_user_activity
+from backend.users.usernames import username_policy
+from backend.users.utils import email_token_generator
+from backend.users.views import CheckUsernameView, IntrospectTokenView, RefreshTokenView, ResetPasswordConfirmView, \
+    ResetPasswordView, SignInView, SignOutView, SignUpView, SigningKeysView, UserActivitySummaryView, \
+    UserActivityView, UserProfileView, UserProfilesView, UserRetrieveUpdateDeleteView, VerifyEmailConfirmView, \
+    VerifyEmailView, VerifyTokenView
+
+
+# Requests every route on its most expensive path and checks that it runs exactly the `query_budget` of its view,
+# so budgets neither fail real requests nor drift above what the views need
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_user_cache.local.clear()
+        UserAgent.objects.ids.clear()
+        username_policy.taken.clear()
+
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.user.token)
+        self.anonymous_client = APIClient()
+
+    def assertWithinBudget(self, view, method, url, data=None, client=None, status_code=200, **extra):
+        client = client or self.client
+
+        with self.assertNumQueries(view.query_budget):
+            response = getattr(client, method)(url, data, format='json', **extra)
+
+        self.assertEqual(response.status_code, status_code, response.content)
+
+        return response
+
+    # A taken username, looked up again for the error message
+    def test_sign_up(self):
+        self.assertWithinBudget(SignUpView, 'post', '/v1/users/', {
+            'username': 'ALICE',
+            'email': 'bob@example.com',
+            'password': 'Password123!',
+            'confirm_password': 'Password123!',
+        }, client=self.anonymous_client, status_code=400)
+
+    def test_check_username(self):
+        self.assertWithinBudget(CheckUsernameView, 'get', '/v1/users/check-username/?username=alice',
+                                client=self.anonymous_client)
+
+    # A password hashed with an outdated hasher, failures to reset, a new user agent and the new sign in email,
+    # with the fingerprints of the previous sign ins out of the cache
+    @override_settings(NEW_SIGN_IN_EMAIL=True, PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+        'django.contrib.auth.hashers.SHA1PasswordHasher',
+    ])
+    def test_sign_in(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password('password123', hasher='sha1'))
+        write_user_activity([{
+            'user_id': self.user.pk,
+            'ip_address': '192.0.2.1',
+            'user_agent': 'Mozilla/5.0',
+            'created_at': timezone.now(),
+        }])
+        self.anonymous_client.post('/v1/users/signin/', {'username': 'alice', 'password': 'wrong'}, format='json')
+        cache.clear()
+
+        self.assertWithinBudget(SignInView, 'post', '/v1/users/signin/', {
+            'username': 'alice',
+            'password': 'password123',
+        }, client=self.anonymous_client, HTTP_USER_AGENT='curl/7.0', REMOTE_ADDR='198.51.100.1')
+
+    def test_verify_token(self):
+        self.assertWithinBudget(VerifyTokenView, 'post', '/v1/users/verify-token/')
+
+    def test_introspect_token(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        bob = User.objects.create_user(username='bob', email='bob@example.com', password='password123')
+
+        self.assertWithinBudget(IntrospectTokenView, 'post', '/v1/users/introspect-token/', {
+            'tokens': [self.user.token, bob.token],
+        })
+
+    def test_signing_keys(self):
+        self.assertWithinBudget(SigningKeysView, 'get', '/v1/users/signing-keys/', client=self.anonymous_client)
+
+    def test_refresh_token(self):
+        self.assertWithinBudget(RefreshTokenView, 'post', '/v1/users/refresh-token/')
+
+    def test_sign_out(self):
+        self.assertWithinBudget(SignOutView, 'post', '/v1/users/signout/')
+
+    @override_settings(PROFILE_CACHE=True)
+    def test_user_profile(self):
+        self.assertWithinBudget(UserProfileView, 'get', '/v1/users/alice/', client=self.anonymous_client)
+
+    @override_settings(PROFILE_CACHE=True)
+    def test_user_profiles(self):
+        bob = User.objects.create_user(username='bob', email='bob@example.com', password='password123')
+
+        self.assertWithinBudget(UserProfilesView, 'post', '/v1/users/profiles/', {
+            'usernames': ['alice'],
+            'ids': [str(bob.pk)],
+        }, client=self.anonymous_client)
+
+    def test_user_update(self):
+        self.assertWithinBudget(UserRetrieveUpdateDeleteView, 'patch', '/v1/users/me/', {
+            'username': 'alice2',
+            'email': 'alice2@example.com',
+            'location': 'Earth',
+            'bio': 'Hello',
+            'password': 'password123',
+            'new_password': 'password456',
+            'confirm_new_password': 'password456',
+        })
+
+    def test_reset_password(self):
+        self.assertWithinBudget(ResetPasswordView, 'post', '/v1/users/reset-password/', {
+            'email': 'alice@example.com',
+        }, client=self.anonymous_client)
+
+    def test_reset_password_confirm(self):
+        self.assertWithinBudget(ResetPasswordConfirmView, 'post', '/v1/users/reset-password/confirm/', {
+            'uid': urlsafe_base64_encode(force_bytes(self.user.pk)),
+            'token': default_token_generator.make_token(self.user),
+            'password': 'Password456!',
+            'confirm_password': 'Password456!',
+        }, client=self.anonymous_client)
+
+    def test_verify_email(self):
+        self.assertWithinBudget(VerifyEmailView, 'post', '/v1/users/verify-email/')
+
+    def test_verify_email_confirm(self):
+        self.assertWithinBudget(VerifyEmailConfirmView, 'post', '/v1/users/verify-email/confirm/', {
+            'uid': urlsafe_base64_encode(force_bytes(self.user.pk)),
+            'token': email_token_generator.make_token(self.user),
+        }, client=self.anonymous_client)
+
+    def test_user_activity(self):
+        write_user_activity([{
+            'user_id': self.user.pk,
+            'ip_address': '192.0.2.1',
+            'user_agent': 'Mozilla/5.0',
+            'created_at': timezone.now(),
+        }])
+
+        self.assertWithinBudget(UserActivityView, 'get', '/v1/users/me/activity/')
+
+    def test_user_activity_summary(self):
+        write_user_activity([{
+            'user_id': self.user.pk,
+            'ip_address': '192.0.2.1',
+            'user_agent': 'Mozilla/5.0',
+            'created_at': timezone.now(),
+        }])
+
+        self.assertWithinBudget(UserActivitySummaryView, 'get', '/v1/users/me/activity/summary/')
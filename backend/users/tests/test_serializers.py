@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.contrib.auth import hashers
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from backend.users.models import User
+
+
+class UserSerializerUpdateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.user.token)
+
+    def update(self, password):
+        return self.client.patch('/v1/users/me/', {
+            'username': 'alice2',
+            'email': 'alice2@example.com',
+            'bio': 'Hello',
+            'password': password,
+            'new_password': 'password456',
+            'confirm_new_password': 'password456',
+        }, format='json')
+
+    def test_password_is_verified_once(self):
+        with mock.patch.object(hashers, 'check_password', wraps=hashers.check_password) as check_password:
+            self.assertEqual(self.update('password123').status_code, 200)
+
+        self.assertEqual(check_password.call_count, 1)
+
+    def test_each_table_is_written_once(self):
+        # Authentication, the throttle, the username and email checks, the primary email and the profile, one write
+        # per table and the password changed email
+        with self.assertNumQueries(10), CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.update('password123').status_code, 200)
+
+        writes = [query['sql'].split('"')[1] for query in context.captured_queries
+                  if query['sql'].startswith(('UPDATE "', 'INSERT INTO "'))]
+        self.assertEqual(writes, ['users', 'users_primary_emails', 'users_profiles', 'users_email_outbox'])
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.username, 'alice2')
+        self.assertEqual(self.user.email, 'alice2@example.com')
+        self.assertFalse(self.user.primary_email.verified)
+        self.assertEqual(self.user.profile.bio, 'Hello')
+        self.assertTrue(self.user.check_password('password456'))
+
+    def test_wrong_password_is_verified_once(self):
+        with mock.patch.object(hashers, 'check_password', wraps=hashers.check_password) as check_password:
+            self.assertNotEqual(self.update('wrong').status_code, 200)
+
+        self.assertEqual(check_password.call_count, 1)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.username, 'alice')
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from backend.users.models import User, UserPrimaryEmail, UserProfile
+from backend.users.usernames import username_policy
+
+
+# Conflicts are only found by the insert of create_account, regardless of case
+class SignUpConflictTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        username_policy.taken.clear()
+        User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+
+    def sign_up(self, username, email):
+        return APIClient().post('/v1/users/', {
+            'username': username,
+            'email': email,
+            'password': 'Password123!',
+            'confirm_password': 'Password123!',
+        }, format='json')
+
+    def assertConflict(self, response, errors):
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'errors': errors})
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(UserProfile.objects.count(), 1)
+        self.assertEqual(UserPrimaryEmail.objects.count(), 1)
+
+    def test_username_in_another_case(self):
+        self.assertConflict(self.sign_up('ALICE', 'bob@example.com'), {
+            'username': ['This username already exists.'],
+        })
+
+    def test_email_in_another_case(self):
+        self.assertConflict(self.sign_up('bob', 'Alice@Example.com'), {
+            'email': ['This email address already exists.'],
+        })
+
+    def test_username_and_email(self):
+        self.assertConflict(self.sign_up('Alice', 'ALICE@example.com'), {
+            'username': ['This username already exists.'],
+            'email': ['This email address already exists.'],
+        })
+
+    def test_no_conflict(self):
+        response = self.sign_up('bob', 'bob@example.com')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(UserProfile.objects.filter(user__username='bob').count(), 1)
+        self.assertEqual(UserPrimaryEmail.objects.filter(user__username='bob').count(), 1)
@@ -0,0 +1,128 @@
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from backend.users import views
+from backend.users.signing import SigningKeyRegistry
+
+PAYLOAD = {'sub': 'alice', 'jti': '00000000-0000-0000-0000-000000000001'}
+
+
+def get_private_pem(private_key):
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()).decode('utf-8')
+
+
+def get_public_pem(private_key):
+    return private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode('utf-8')
+
+
+def get_registry(*keys):
+    with override_settings(JWT_SIGNING_KEYS=list(keys)):
+        registry = SigningKeyRegistry()
+        # Keys are parsed on first use
+        registry.keys
+
+    return registry
+
+
+class SigningKeyRegistryTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.ed25519_pem = get_private_pem(Ed25519PrivateKey.generate())
+        cls.retired_ed25519_key = Ed25519PrivateKey.generate()
+        cls.rsa_pem = get_private_pem(rsa.generate_private_key(65537, 2048, default_backend()))
+
+    def test_eddsa_round_trip(self):
+        registry = get_registry({'kid': 'ed', 'algorithm': 'EdDSA', 'private_key': self.ed25519_pem})
+        token = registry.encode(PAYLOAD)
+
+        self.assertEqual(jwt.get_unverified_header(token)['alg'], 'EdDSA')
+        self.assertEqual(registry.decode(token), PAYLOAD)
+
+    def test_rs256_round_trip(self):
+        registry = get_registry({'kid': 'rsa', 'algorithm': 'RS256', 'private_key': self.rsa_pem})
+        token = registry.encode(PAYLOAD)
+
+        self.assertEqual(jwt.get_unverified_header(token)['alg'], 'RS256')
+        self.assertEqual(registry.decode(token), PAYLOAD)
+
+    def test_first_key_with_private_key_signs(self):
+        registry = get_registry(
+            {'kid': 'retired', 'algorithm': 'EdDSA', 'public_key': get_public_pem(self.retired_ed25519_key)},
+            {'kid': 'current', 'algorithm': 'EdDSA', 'private_key': self.ed25519_pem},
+            {'kid': 'rsa', 'algorithm': 'RS256', 'private_key': self.rsa_pem},
+        )
+
+        self.assertEqual(jwt.get_unverified_header(registry.encode(PAYLOAD))['kid'], 'current')
+
+    def test_token_without_kid_verifies_with_first_key(self):
+        token = get_registry({'kid': None, 'algorithm': 'HS256', 'private_key': 'secret'}).encode(PAYLOAD)
+        registry = get_registry(
+            {'kid': None, 'algorithm': 'HS256', 'private_key': 'secret'},
+            {'kid': 'ed', 'algorithm': 'EdDSA', 'private_key': self.ed25519_pem},
+        )
+
+        self.assertNotIn('kid', jwt.get_unverified_header(token))
+        self.assertEqual(registry.decode(token), PAYLOAD)
+
+    def test_retired_key_only_verifies(self):
+        token = get_registry({
+            'kid': 'retired', 'algorithm': 'EdDSA', 'private_key': get_private_pem(self.retired_ed25519_key),
+        }).encode(PAYLOAD)
+        registry = get_registry(
+            {'kid': 'current', 'algorithm': 'EdDSA', 'private_key': self.ed25519_pem},
+            {'kid': 'retired', 'algorithm': 'EdDSA', 'public_key': get_public_pem(self.retired_ed25519_key)},
+        )
+
+        self.assertEqual(registry.decode(token), PAYLOAD)
+        self.assertEqual(jwt.get_unverified_header(registry.encode(PAYLOAD))['kid'], 'current')
+
+    def test_unknown_kid_is_rejected(self):
+        token = get_registry({'kid': 'other', 'algorithm': 'EdDSA', 'private_key': self.ed25519_pem}).encode(PAYLOAD)
+        registry = get_registry({'kid': 'current', 'algorithm': 'EdDSA', 'private_key': self.ed25519_pem})
+
+        with self.assertRaisesMessage(jwt.InvalidTokenError, 'Unknown signing key.'):
+            registry.decode(token)
+
+    def test_mismatched_algorithm_is_rejected(self):
+        registry = get_registry({'kid': 'rsa', 'algorithm': 'RS256', 'private_key': self.rsa_pem})
+        # An HMAC token under the kid of the RSA key
+        token = jwt.encode(PAYLOAD, 'secret', algorithm='HS256', headers={'kid': 'rsa'})
+
+        with self.assertRaises(jwt.InvalidAlgorithmError):
+            registry.decode(token)
+
+
+class SigningKeysViewTests(TestCase):
+    def test_lists_public_keys(self):
+        registry = get_registry(
+            {'kid': 'ed', 'algorithm': 'EdDSA', 'private_key': get_private_pem(Ed25519PrivateKey.generate())},
+            {'kid': 'retired', 'algorithm': 'EdDSA', 'public_key': get_public_pem(Ed25519PrivateKey.generate())},
+            {'kid': 'rsa', 'algorithm': 'RS256',
+             'private_key': get_private_pem(rsa.generate_private_key(65537, 2048, default_backend()))},
+            {'kid': 'hmac', 'algorithm': 'HS256', 'private_key': 'secret'},
+        )
+
+        with mock.patch.object(views, 'signing_keys', registry):
+            response = APIClient().get('/v1/users/signing-keys/')
+
+        keys = response.json()['keys']
+
+        # The HMAC key is secret, the private parts of the others stay out
+        self.assertEqual([(key['kid'], key['alg'], key['kty'], key['use']) for key in keys], [
+            ('ed', 'EdDSA', 'OKP', 'sig'),
+            ('retired', 'EdDSA', 'OKP', 'sig'),
+            ('rsa', 'RS256', 'RSA', 'sig'),
+        ])
+        self.assertFalse(any('d' in key for key in keys))
+        self.assertEqual(keys[0]['x'], registry.keys[0].jwk['x'])
@@ -0,0 +1,70 @@
+import uuid
+from multiprocessing import Pool
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.test import TransactionTestCase
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from backend.users.models import User
+from config.throttle import AnonGCRAThrottle, UserGCRAThrottle
+
+WORKERS = 4
+ATTEMPTS = 25
+USER_ID = uuid.UUID('00000000-0000-0000-0000-000000000001')
+
+
+class LimitedAnonThrottle(AnonGCRAThrottle):
+    rate = '50/hour'
+
+
+class LimitedUserThrottle(UserGCRAThrottle):
+    rate = '50/hour'
+
+
+def get_request(user=None):
+    request = APIRequestFactory().post('/', REMOTE_ADDR='192.0.2.1')
+    request.user = user or AnonymousUser()
+
+    return request
+
+
+def attempt(throttle_class):
+    throttle = throttle_class()
+    request = get_request(User(pk=USER_ID) if throttle_class is LimitedUserThrottle else None)
+
+    return sum(throttle.allow_request(request, None) for _ in range(ATTEMPTS))
+
+
+class GCRAThrottleTests(TransactionTestCase):
+    def test_defaults(self):
+        self.assertEqual(api_settings.DEFAULT_THROTTLE_CLASSES, [AnonGCRAThrottle, UserGCRAThrottle])
+
+    def assertLimitHoldsAcrossProcesses(self, throttle_class):
+        # Forked workers open connections of their own
+        connections.close_all()
+
+        with Pool(WORKERS) as pool:
+            allowed = pool.map(attempt, [throttle_class] * WORKERS)
+
+        self.assertEqual(sum(allowed), 50)
+
+    def test_anon_limit_holds_across_processes(self):
+        self.assertLimitHoldsAcrossProcesses(LimitedAnonThrottle)
+
+    def test_user_limit_holds_across_processes(self):
+        self.assertLimitHoldsAcrossProcesses(LimitedUserThrottle)
+
+    def test_user_throttle_skips_anonymous_requests(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(LimitedUserThrottle().allow_request(get_request(), None))
+
+    def test_wait(self):
+        throttle = LimitedAnonThrottle()
+        request = get_request()
+
+        while throttle.allow_request(request, None):
+            pass
+
+        self.assertAlmostEqual(throttle.wait(), 72, delta=1)
@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from backend.users.models import UserAgent
+
+FIREFOX = 'Mozilla/5.0 (X11; Linux x86_64; rv:70.0) Gecko/20100101 Firefox/70.0'
+CURL = 'curl/7.0'
+
+
+# Ids reach the LRU on commit, which TestCase never gets to
+class UserAgentInterningTests(TransactionTestCase):
+    def setUp(self):
+        UserAgent.objects.ids.clear()
+
+    def test_new_user_agents_are_inserted_once(self):
+        with self.assertNumQueries(2):
+            ids = UserAgent.objects.get_ids([FIREFOX, CURL, FIREFOX, None])
+
+        self.assertEqual(set(ids), {FIREFOX, CURL})
+        self.assertEqual(UserAgent.objects.count(), 2)
+
+        firefox = UserAgent.objects.get(pk=ids[FIREFOX])
+        self.assertEqual((firefox.value, firefox.browser, firefox.os, firefox.device),
+                         (FIREFOX, 'Firefox', 'Linux', 'Desktop'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(UserAgent.objects.get_ids([FIREFOX, CURL]), ids)
+
+    def test_known_user_agents_are_read_once(self):
+        ids = UserAgent.objects.get_ids([FIREFOX])
+        UserAgent.objects.ids.clear()
+
+        with self.assertNumQueries(2):
+            self.assertEqual(UserAgent.objects.get_ids([FIREFOX]), ids)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(UserAgent.objects.get_ids([FIREFOX]), ids)
+
+    def test_rolled_back_ids_are_not_cached(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            UserAgent.objects.get_ids([FIREFOX])
+            raise ValueError
+
+        self.assertIsNone(UserAgent.objects.ids.get(FIREFOX))
+        self.assertFalse(UserAgent.objects.exists())
+
+        ids = UserAgent.objects.get_ids([FIREFOX])
+
+        self.assertEqual(UserAgent.objects.get().pk, ids[FIREFOX])
+        self.assertEqual(UserAgent.objects.ids.get(FIREFOX), ids[FIREFOX])
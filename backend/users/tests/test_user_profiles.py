@@ -0,0 +1,57 @@
+import uuid
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from backend.users.models import User
+
+
+class UserProfilesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='password123')
+        self.bob = User.objects.create_user(username='Bob', email='bob@example.com', password='password123')
+        User.objects.create_user(username='carol', email='carol@example.com', password='password123')
+        self.alice.profile.bio = 'Hello'
+        self.alice.profile.save()
+
+    def get_profiles(self, data):
+        return APIClient().post('/v1/users/profiles/', data, format='json')
+
+    def test_usernames_and_ids(self):
+        # The throttle and one query for every user
+        with self.assertNumQueries(2):
+            response = self.get_profiles({
+                'usernames': ['ALICE', 'unknown'],
+                'ids': [str(self.bob.pk), str(uuid.uuid4())],
+            })
+
+        self.assertEqual(response.status_code, 200)
+        profiles = response.json()['profiles']
+
+        self.assertEqual(sorted(profiles), ['Bob', 'alice'])
+        self.assertEqual(profiles['alice']['bio'], 'Hello')
+        self.assertEqual(profiles['Bob']['id'], str(self.bob.pk))
+
+    @override_settings(PROFILE_CACHE=True)
+    def test_cached_profiles_skip_the_database(self):
+        profiles = self.get_profiles({'usernames': ['alice', 'bob']}).json()['profiles']
+
+        with self.assertNumQueries(1):
+            response = self.get_profiles({'usernames': ['Alice', 'BOB']})
+
+        self.assertEqual(response.json()['profiles'], profiles)
+
+    def test_usernames_or_ids_are_required(self):
+        response = self.get_profiles({'usernames': [], 'ids': []})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'errors': {'error': ['Please provide usernames or ids.']}})
+
+    @override_settings(USER_PROFILES_MAX=2)
+    def test_at_most_user_profiles_max(self):
+        response = self.get_profiles({'usernames': ['alice', 'bob'], 'ids': [str(uuid.uuid4())]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'errors': {'error': ['Please provide at most 2 usernames and ids.']}})
@@ -2,7 +2,8 @@ from django.urls import path
 
 from .views import SignUpView, UserRetrieveUpdateDeleteView, UserActivityView, SignInView, SignOutView, \
     VerifyTokenView, RefreshTokenView, ResetPasswordView, ResetPasswordConfirmView, VerifyEmailView, \
-    VerifyEmailConfirmView, UserProfileView
+    VerifyEmailConfirmView, UserProfileView, IntrospectTokenView, \
+    SigningKeysView, CheckUsernameView, UserProfilesView, UserActivitySummaryView
 
 app_name = 'users'
 
@@ -10,9 +11,14 @@ urlpatterns = [
     path('users/', SignUpView.as_view()),
     path('users/me/', UserRetrieveUpdateDeleteView.as_view()),
     path('users/me/activity/', UserActivityView.as_view()),
+    path('users/me/activity/summary/', UserActivitySummaryView.as_view()),
+    path('users/check-username/', CheckUsernameView.as_view()),
+    path('users/profiles/', UserProfilesView.as_view()),
     path('users/signin/', SignInView.as_view()),
     path('users/signout/', SignOutView.as_view()),
     path('users/verify-token/', VerifyTokenView.as_view()),
+    path('users/introspect-token/', IntrospectTokenView.as_view()),
+    path('users/signing-keys/', SigningKeysView.as_view()),
     path('users/refresh-token/', RefreshTokenView.as_view()),
     path('users/reset-password/', ResetPasswordView.as_view()),
     path('users/reset-password/confirm/', ResetPasswordConfirmView.as_view()),
@@ -0,0 +1,70 @@
+import re
+
+from django.conf import settings
+from rest_framework import serializers
+
+from config.blacklist import USERNAME_BLACKLIST, USERNAME_RESERVED_PATTERNS, USERNAME_RESERVED_PREFIXES
+from .cache import LocalCache
+from .models import User
+
+
+# Username rules compiled once per process, every comparison is case-insensitive. Usernames found to be taken
+# are remembered for USERNAME_TAKEN_CACHE_TIMEOUT seconds when USERNAME_TAKEN_CACHE is set, a name freed in the
+# meantime is reported as taken until then.
+class UsernamePolicy:
+    pattern = re.compile('[a-zA-Z0-9]+')
+
+    def __init__(self, blacklist, reserved_prefixes, reserved_patterns):
+        self.blacklist = frozenset(username.lower() for username in blacklist)
+        self.reserved_prefixes = tuple(prefix.lower() for prefix in reserved_prefixes)
+        self.reserved_pattern = re.compile('|'.join('(?:%s)' % pattern for pattern in reserved_patterns) or '(?!)')
+        self._taken = None
+
+    @property
+    def taken(self):
+        if self._taken is None:
+            self._taken = LocalCache(
+                settings.USERNAME_TAKEN_CACHE_MAX_SIZE, settings.USERNAME_TAKEN_CACHE_TIMEOUT)
+
+        return self._taken
+
+    def is_valid(self, username):
+        return self.pattern.fullmatch(username) is not None
+
+    def is_reserved(self, username):
+        username = username.lower()
+
+        return (username in self.blacklist or username.startswith(self.reserved_prefixes) or
+                self.reserved_pattern.fullmatch(username) is not None)
+
+    def validate(self, username):
+        if not self.is_valid(username):
+            raise serializers.ValidationError('A valid username is required.')
+
+        if self.is_reserved(username):
+            raise serializers.ValidationError(
+                'This username is not acceptable.')
+
+    # A user's own username, in any case, is not taken for them
+    def is_taken(self, username, user=None):
+        username = username.lower()
+
+        if user is not None and user.username.lower() == username:
+            return False
+
+        if settings.USERNAME_TAKEN_CACHE and self.taken.get(username):
+            return True
+
+        is_taken = User.objects.filter(username__lower=username).exists()
+
+        if is_taken:
+            self.set_taken(username)
+
+        return is_taken
+
+    def set_taken(self, username):
+        if settings.USERNAME_TAKEN_CACHE:
+            self.taken.set(username.lower(), True)
+
+
+username_policy = UsernamePolicy(USERNAME_BLACKLIST, USERNAME_RESERVED_PREFIXES, USERNAME_RESERVED_PATTERNS)
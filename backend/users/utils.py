@@ -1,5 +1,40 @@
+import hashlib
+import ipaddress
+import re
+
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 
+# First match wins, so more specific user agents come before the ones they imitate
+BROWSER_PATTERNS = [(re.compile(pattern), family) for pattern, family in (
+    (r'(?i)bot|crawler|spider|slurp', 'Bot'),
+    (r'Edge?/|EdgiOS/|EdgA/', 'Edge'),
+    (r'OPR/|Opera', 'Opera'),
+    (r'SamsungBrowser/', 'Samsung Internet'),
+    (r'Chrome/|CriOS/', 'Chrome'),
+    (r'Firefox/|FxiOS/', 'Firefox'),
+    (r'Version/[\d.]+.*Safari/', 'Safari'),
+    (r'MSIE |Trident/', 'Internet Explorer'),
+    (r'^curl/', 'curl'),
+    (r'^python-requests/', 'Python Requests'),
+    (r'^okhttp/', 'OkHttp'),
+)]
+
+OS_PATTERNS = [(re.compile(pattern), family) for pattern, family in (
+    (r'Windows', 'Windows'),
+    (r'iPhone|iPad|iPod', 'iOS'),
+    (r'Mac OS X|Macintosh', 'Mac OS X'),
+    (r'Android', 'Android'),
+    (r'CrOS', 'Chrome OS'),
+    (r'Linux', 'Linux'),
+)]
+
+DEVICE_PATTERNS = [(re.compile(pattern), family) for pattern, family in (
+    (r'(?i)bot|crawler|spider|slurp', 'Bot'),
+    (r'iPad|Tablet|Android(?!.*Mobile)', 'Tablet'),
+    (r'Mobi|iPhone|iPod', 'Mobile'),
+    (r'Windows|Macintosh|CrOS|X11', 'Desktop'),
+)]
+
 
 def get_ip_address(request):
     http_x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -19,13 +54,56 @@ def get_user_agent(request):
     http_user_agent = request.META.get('HTTP_USER_AGENT')
 
     if http_user_agent:
-        user_agent = http_user_agent
+        user_agent = http_user_agent[:255]
     else:
         user_agent = None
 
     return user_agent
 
 
+def get_family(patterns, value):
+    for pattern, family in patterns:
+        if pattern.search(value):
+            return family
+
+    return 'Other'
+
+
+def parse_user_agent(user_agent):
+    return {
+        'browser': get_family(BROWSER_PATTERNS, user_agent),
+        'os': get_family(OS_PATTERNS, user_agent),
+        'device': get_family(DEVICE_PATTERNS, user_agent),
+    }
+
+
+def get_fingerprint(*values):
+    digest = hashlib.blake2b('\x00'.join(values).encode(), digest_size=8).digest()
+
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+# Fingerprints of the network and the kind of device of a sign in. Addresses are widened to their /24 or /48 so
+# that a new address from the same provider does not count as a new location.
+def get_sign_in_fingerprints(ip_address, user_agent):
+    fingerprints = []
+
+    if ip_address is not None:
+        try:
+            ip_address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            pass
+        else:
+            prefix = 24 if ip_address.version == 4 else 48
+            fingerprints.append(get_fingerprint(
+                'network', str(ipaddress.ip_network((ip_address, prefix), strict=False))))
+
+    if user_agent is not None:
+        fingerprints.append(get_fingerprint('device', *parse_user_agent(user_agent).values()))
+
+    return fingerprints
+
+
 class EmailVerifyTokenGenerator(PasswordResetTokenGenerator):
     def _make_hash_value(self, user, timestamp):
         login_timestamp = '' if user.last_login is None else user.last_login.replace(
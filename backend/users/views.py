@@ -1,17 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.signals import user_logged_in
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import exceptions
 from rest_framework import generics
 from rest_framework import status
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from config.throttle import SignUpThrottle, SignInThrottle, ResetPasswordThrottle, VerifyEmailThrottle
+from config.throttle import SignUpThrottle, SignInThrottle, ResetPasswordThrottle, VerifyEmailThrottle, \
+    CheckUsernameThrottle
+from .backends import JWTVerifyAuthentication
+from .cache import profile_response_cache
 from .email import send_reset_password_email, send_email_verification
-from .models import User, UserActivity
+from .models import User, UserActivity, UserActivityAddress, UserActivityDay
 from .pagination import UserActivityPagination
 from .serializers import SignUpSerializer, SignInSerializer, UserProfileSerializer, UserSerializer, \
-    ResetPasswordSerializer, ResetPasswordConfirmSerializer, VerifyEmailConfirmSerializer, UserActivitySerializer
+    ResetPasswordSerializer, ResetPasswordConfirmSerializer, VerifyEmailConfirmSerializer, UserActivitySerializer, \
+    IntrospectTokenSerializer, CheckUsernameSerializer, UserProfilesSerializer, render_user_profile, \
+    UserActivitySummarySerializer
+from .signing import signing_keys
 
 
 class SignUpView(generics.CreateAPIView):
@@ -19,6 +32,7 @@ class SignUpView(generics.CreateAPIView):
     permission_classes = (AllowAny,)
     authentication_classes = ()
     throttle_classes = (SignUpThrottle,)
+    query_budget = 3
 
     def create(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -30,14 +44,34 @@ class SignUpView(generics.CreateAPIView):
         return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CheckUsernameView(generics.GenericAPIView):
+    serializer_class = CheckUsernameSerializer
+    permission_classes = (AllowAny,)
+    authentication_classes = ()
+    throttle_classes = (CheckUsernameThrottle,)
+    query_budget = 3
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.query_params)
+
+        if serializer.is_valid(raise_exception=True):
+            return Response(data=serializer.validated_data['result'], status=status.HTTP_200_OK)
+
+        return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 class SignInView(generics.GenericAPIView):
     serializer_class = SignInSerializer
     permission_classes = (AllowAny,)
     authentication_classes = ()
     throttle_classes = (SignInThrottle,)
+    # The activity is written during the request without USER_ACTIVITY_BUFFER. A rehashed password, a lockout
+    # reset, a new user agent and NEW_SIGN_IN_EMAIL take up to eight more queries.
+    query_budget = 17
 
     def post(self, request, *args, **kwargs):
-        serializer = self.serializer_class(data=request.data)
+        serializer = self.serializer_class(
+            data=request.data, context={'request': request})
 
         if serializer.is_valid(raise_exception=True):
             user = serializer.validated_data['user']
@@ -52,14 +86,44 @@ class SignInView(generics.GenericAPIView):
 
 
 class VerifyTokenView(APIView):
+    authentication_classes = (JWTVerifyAuthentication,)
     permission_classes = (IsAuthenticated,)
+    query_budget = 2
 
     def post(self, request, *args, **kwargs):
         return Response(data=None, status=status.HTTP_200_OK)
 
 
+class IntrospectTokenView(generics.GenericAPIView):
+    serializer_class = IntrospectTokenSerializer
+    permission_classes = (IsAdminUser,)
+    query_budget = 3
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+
+        if serializer.is_valid(raise_exception=True):
+            return Response({
+                'tokens': serializer.validated_data['results']
+            }, status=status.HTTP_200_OK)
+
+        return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class SigningKeysView(APIView):
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    query_budget = 1
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'keys': signing_keys.get_public_keys()
+        }, status=status.HTTP_200_OK)
+
+
 class RefreshTokenView(APIView):
     permission_classes = (IsAuthenticated,)
+    query_budget = 3
 
     def post(self, request, *args, **kwargs):
         user = request.user
@@ -72,6 +136,7 @@ class RefreshTokenView(APIView):
 
 class SignOutView(APIView):
     permission_classes = (IsAuthenticated,)
+    query_budget = 3
 
     def post(self, request, *args, **kwargs):
         user = request.user
@@ -81,16 +146,56 @@ class SignOutView(APIView):
 
 
 class UserProfileView(generics.RetrieveAPIView):
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('profile')
     serializer_class = UserProfileSerializer
-    lookup_field = 'username'
     authentication_classes = ()
     permission_classes = (AllowAny,)
+    query_budget = 2
+
+    def get_object(self):
+        return generics.get_object_or_404(self.get_queryset(), username__lower=self.kwargs['username'].lower())
+
+    # Serves the rendered bytes from the cache when possible, skipping the database and the serializer
+    def retrieve(self, request, *args, **kwargs):
+        username = self.kwargs['username']
+        cached = profile_response_cache.get(username) if profile_response_cache.enabled else None
+
+        if cached is None:
+            instance = self.get_object()
+            cached = render_user_profile(self.get_serializer(instance).data, instance)
+
+            if profile_response_cache.enabled:
+                profile_response_cache.set(username, cached)
+
+        response = HttpResponse(cached['content'], content_type='application/json')
+        response['ETag'] = cached['etag']
+        response['Last-Modified'] = http_date(cached['last_modified'])
+
+        return get_conditional_response(
+            request, etag=cached['etag'], last_modified=cached['last_modified'], response=response)
+
+
+class UserProfilesView(generics.GenericAPIView):
+    serializer_class = UserProfilesSerializer
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    query_budget = 2
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+
+        if serializer.is_valid(raise_exception=True):
+            return Response({
+                'profiles': serializer.validated_data['profiles']
+            }, status=status.HTTP_200_OK)
+
+        return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class UserRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticated,)
+    query_budget = 10
 
     def retrieve(self, request, *args, **kwargs):
         serializer = self.serializer_class(request.user)
@@ -110,7 +215,8 @@ class UserRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     def delete(self, request, *args, **kwargs):
         user = request.user
         user.is_active = False
-        user.generate_token_identifier()
+        user.generate_token_identifier(commit=False)
+        user.save(update_fields=['is_active', 'token_identifier'])
 
         return Response(data=None, status=status.HTTP_200_OK)
 
@@ -120,12 +226,14 @@ class ResetPasswordView(generics.GenericAPIView):
     authentication_classes = ()
     permission_classes = (AllowAny,)
     throttle_classes = (ResetPasswordThrottle,)
+    query_budget = 4
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
 
         if serializer.is_valid(raise_exception=True):
-            user = User.objects.get(email=serializer.validated_data['email'])
+            user = User.objects.filter_by_email(
+                serializer.validated_data['email']).get()
             send_reset_password_email(user)
             return Response(data=None, status=status.HTTP_200_OK)
 
@@ -136,6 +244,7 @@ class ResetPasswordConfirmView(generics.GenericAPIView):
     serializer_class = ResetPasswordConfirmSerializer
     authentication_classes = ()
     permission_classes = (AllowAny,)
+    query_budget = 3
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -149,6 +258,8 @@ class ResetPasswordConfirmView(generics.GenericAPIView):
 class VerifyEmailView(generics.GenericAPIView):
     permission_classes = (IsAuthenticated,)
     throttle_classes = (VerifyEmailThrottle,)
+    authentication_select_related = ('primary_email',)
+    query_budget = 3
 
     def post(self, request, *args, **kwargs):
         user = request.user
@@ -166,6 +277,7 @@ class VerifyEmailConfirmView(generics.GenericAPIView):
     serializer_class = VerifyEmailConfirmSerializer
     authentication_classes = ()
     permission_classes = (AllowAny,)
+    query_budget = 3
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -177,10 +289,42 @@ class VerifyEmailConfirmView(generics.GenericAPIView):
 
 
 class UserActivityView(generics.ListAPIView):
-    queryset = UserActivity.objects.all()
+    queryset = UserActivity.objects.select_related('user_agent')
     serializer_class = UserActivitySerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = UserActivityPagination
+    query_budget = 3
 
     def filter_queryset(self, queryset):
         return self.queryset.filter(user=self.request.user)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+
+        # Every row belongs to the requesting user, the serializer reads its username from there
+        for activity in page:
+            activity.user = self.request.user
+
+        return page
+
+
+# Logins per day, distinct IP addresses and the last sign in over the last USER_ACTIVITY_SUMMARY_DAYS days, read
+# from the rollup tables
+class UserActivitySummaryView(APIView):
+    permission_classes = (IsAuthenticated,)
+    query_budget = 5
+
+    def get(self, request, *args, **kwargs):
+        since = timezone.now() - timedelta(days=settings.USER_ACTIVITY_SUMMARY_DAYS)
+        days = list(UserActivityDay.objects.filter(
+            user=request.user, date__gte=timezone.localdate(since)))
+        last_seen = UserActivityDay.objects.filter(
+            user=request.user).values_list('last_seen', flat=True).first()
+
+        serializer = UserActivitySummarySerializer({
+            'last_seen': last_seen,
+            'ip_addresses': UserActivityAddress.objects.filter(user=request.user, last_seen__gte=since).count(),
+            'days': days,
+        })
+
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
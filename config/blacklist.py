@@ -58,3 +58,9 @@ USERNAME_BLACKLIST = ['.htaccess', '.htpasswd', '.well-known', '400', '401', '40
                       'user', 'username', 'users', 'uucp', 'var', 'verify', 'video', 'view', 'void', 'vote', 'webmail',
                       'webmaster', 'website', 'widget', 'widgets', 'wiki', 'wpad', 'write', 'www', 'www-data', 'www1',
                       'www2', 'www3', 'www4', 'you', 'yourname', 'yourusername', 'zlib']
+
+# Usernames starting with any of these prefixes are not acceptable either
+USERNAME_RESERVED_PREFIXES = ['admin', 'moderator', 'official', 'webmaster']
+
+# Usernames fully matching any of these patterns are not acceptable either
+USERNAME_RESERVED_PATTERNS = [r'[0-9]+']
@@ -0,0 +1,52 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+# Counts the queries of every request, on every database, and compares them with the `query_budget` attribute
+# of its view. Over budget requests are logged with QUERY_BUDGET = 'log' and fail with 'raise'.
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_BUDGET:
+            return self.get_response(request)
+
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+
+            response = self.get_response(request)
+
+        budget = getattr(request, 'query_budget', None)
+
+        if budget is not None and len(queries) > budget:
+            message = '%s %s ran %d queries, its budget is %d:\n%s' % (
+                request.method, request.path, len(queries), budget, '\n'.join(queries))
+
+            if settings.QUERY_BUDGET == 'raise':
+                raise QueryBudgetExceeded(message)
+
+            logger.warning(message)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request.query_budget = getattr(view_func, 'query_budget', getattr(view_class, 'query_budget', None))
@@ -21,6 +21,8 @@ DATABASES = {
 
 DEBUG = True
 
+QUERY_BUDGET = 'log'
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_HOST = 'localhost'
 EMAIL_PORT = 25
@@ -35,6 +35,11 @@ DATABASES = {
 DATABASES['default']['ATOMIC_REQUESTS'] = True
 DATABASES['default']['CONN_MAX_AGE'] = 300
 
+# Same database, throttles are written outside of the request's transaction
+DATABASES['throttle'] = dict(DATABASES['default'], ATOMIC_REQUESTS=False)
+
+THROTTLE_DATABASE = 'throttle'
+
 DEBUG = False
 
 EMAIL_HOST = parameter_store('/prod/EMAIL_HOST')
@@ -18,6 +18,12 @@ PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher',
 ]
 
+# Fail requests that run more queries than their view's budget
+QUERY_BUDGET = 'raise'
+
+# Record user activity during the request
+USER_ACTIVITY_BUFFER = False
+
 SECRET_KEY = 'jr7)nuw^&47$z@+h7^yd-np22p)8e_2e)i&3y#z8br_ae_yr(c'
 
 TEST_RUNNER = 'django.test.runner.DiscoverRunner'
@@ -1,21 +1,69 @@
+from django.conf import settings
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 
+from backend.users.models import Throttle
 
-class SignUpThrottle(AnonRateThrottle):
+
+# Keeps one row per key in the users_throttles table instead of a list of timestamps in the cache, so every
+# worker enforces the same limit and a check is a single upsert regardless of the rate.
+class GCRAThrottleMixin:
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        self.interval = self.duration / self.num_requests
+
+        return Throttle.objects.acquire(self.key, self.now, self.interval, self.duration)
+
+    def wait(self):
+        tat = Throttle.objects.using(settings.THROTTLE_DATABASE).filter(
+            key=self.key).values_list('tat', flat=True).first()
+
+        if tat is None:
+            return None
+
+        return max(tat + self.interval - self.duration - self.now, 0)
+
+
+class AnonGCRAThrottle(GCRAThrottleMixin, AnonRateThrottle):
+    pass
+
+
+# Anonymous requests are left to the stricter AnonGCRAThrottle, so every request pays for a single upsert
+class UserGCRAThrottle(GCRAThrottleMixin, UserRateThrottle):
+    def get_cache_key(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return None
+
+        return super().get_cache_key(request, view)
+
+
+class SignUpThrottle(AnonGCRAThrottle):
     scope = 'sustained'
     rate = '3/hour'
 
 
-class SignInThrottle(AnonRateThrottle):
+# Checked on every keystroke of the sign up form
+class CheckUsernameThrottle(AnonGCRAThrottle):
+    scope = 'burst'
+    rate = '60/minute'
+
+
+class SignInThrottle(AnonGCRAThrottle):
     scope = 'sustained'
     rate = '3/hour'
 
 
-class ResetPasswordThrottle(AnonRateThrottle):
+class ResetPasswordThrottle(AnonGCRAThrottle):
     scope = 'sustained'
     rate = '3/hour'
 
 
-class VerifyEmailThrottle(UserRateThrottle):
+class VerifyEmailThrottle(UserGCRAThrottle):
     scope = 'sustained'
     rate = '3/hour'